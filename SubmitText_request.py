@@ -1,72 +1,326 @@
 import requests
+import argparse
+import asyncio
 import os
-import sys
 import time
-from unidecode import unidecode
-
-
-def submit_pmids_request(input_file, bioconcept, output_file_session_number):
-    unicode_to_regular = {}
-
-    # Load the unicode translation table
-    with open('neurodegenerative-disease/lib/unicode.txt', 'r', encoding='utf-8') as input_file_unicode:
-        for line in input_file_unicode:
-            line = line.strip()
-            parts = line.split("\t")
-            if len(parts) == 2:
-                uni, reg = parts
-                unicode_to_regular[uni] = reg
-
-    with open(output_file_session_number, 'w', encoding='utf-8') as output_file:
-        with open(input_file, 'r', encoding='utf-8') as pmid_file:
-            pmids = []
-            for line in pmid_file:
-                pmid = line.strip()
-                if pmid:  # Skip empty lines
-                    pmids.append(pmid)
-
-            # Process PMIDs in batches of 100
-            for i in range(0, len(pmids), 100):
-                batch_pmids = pmids[i:i + 100]
-                pmids_string = ','.join(batch_pmids)
-
-                # Prepare and send the request to PubTator using the PMIDs
-                url = f"https://www.ncbi.nlm.nih.gov/research/pubtator3-api/publications/export/pubtator?pmids={pmids_string}"
-                print(f"Submitting PMIDs: {pmids_string}")
-
-                try:
-                    # Send the request
-                    response = requests.get(url)
-
-                    # Debugging: Log the response status code
-                    print(f"Response status code: {response.status_code}")
-
-                    if response.status_code == 200:
-                        # Successfully retrieved data
-                        annotations = response.text
-                        output_file.write(f"PMIDs: {pmids_string}\n")
-                        output_file.write("Annotations:\n")
-                        output_file.write(annotations + "\n\n")
-                        output_file.flush()  # Ensure immediate writing to file
+from batch_scheduler import AdaptiveBatchScheduler
+from pubtator_cache import PubTatorCache, split_documents
+from pubtator_documents import aiter_bioc_documents, document_to_json, iter_bioc_documents
+from unicode_normalize import normalize_document, normalize_text
+
+PUBTATOR_EXPORT_URL = "https://www.ncbi.nlm.nih.gov/research/pubtator3-api/publications/export/pubtator"
+BIOC_JSON_EXPORT_URL = "https://www.ncbi.nlm.nih.gov/research/pubtator3-api/publications/export/biocjson"
+
+# "pubtator" writes the PubTator text export; "biocjson" streams the BioC-JSON
+# export straight into Document records, written one JSON object per line
+EXPORT_FORMATS = ('pubtator', 'biocjson')
+
+# PubTator asks clients to stay at or below three requests per second
+DEFAULT_REQUESTS_PER_SECOND = 3
+DEFAULT_CONCURRENCY = 4
+# Largest batch the export endpoint accepts; the scheduler shrinks it when needed
+BATCH_SIZE = 100
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by every fetch worker.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``; each
+    request takes one token, so the combined request rate of all workers never
+    exceeds the quota while idle time is not wasted.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # The lock keeps waiters in FIFO order while one of them sleeps for a refill
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def read_pmids(input_file):
+    pmids = []
+    with open(input_file, 'r', encoding='utf-8') as pmid_file:
+        for line in pmid_file:
+            pmid = line.strip()
+            if pmid:  # Skip empty lines
+                pmids.append(pmid)
+    return pmids
+
+
+def write_batch(output_file, batch_pmids, annotations):
+    output_file.write(f"PMIDs: {','.join(batch_pmids)}\n")
+    output_file.write("Annotations:\n")
+    output_file.write(annotations + "\n\n")
+    output_file.flush()  # Ensure immediate writing to file
+
+
+def export_url(export_format, pmids_string):
+    base_url = BIOC_JSON_EXPORT_URL if export_format == 'biocjson' else PUBTATOR_EXPORT_URL
+    return f"{base_url}?pmids={pmids_string}"
+
+
+def open_cache(cache_dir, export_format):
+    # Records and text blocks are kept apart so one directory can serve both formats
+    if export_format == 'biocjson':
+        cache_dir = os.path.join(cache_dir, 'biocjson')
+    return PubTatorCache(cache_dir)
+
+
+def assemble_from_cache(cache, pmids, output_file_session_number, export_format='pubtator'):
+    if export_format == 'biocjson':
+        not_cached = cache.assemble_records(pmids, output_file_session_number)
+    else:
+        not_cached = cache.assemble(pmids, output_file_session_number, batch_size=BATCH_SIZE)
+    print(f"Assembled {len(pmids) - not_cached} cached documents into {output_file_session_number}")
+    if not_cached:
+        print(f"{not_cached} PMIDs are still missing; rerun to fetch them")
+
+
+def fetch_batches(scheduler, store, export_format='pubtator'):
+    """Fetch scheduled batches in turn and hand successful responses to ``store``.
+
+    ``store`` receives the response text, or the list of ``Document`` records in
+    BioC-JSON mode, and returns the PMIDs of the batch missing from the response.
+    """
+    # Reuse one keep-alive connection for every batch
+    with requests.Session() as session:
+        while not scheduler.finished():
+            batch_pmids, wait = scheduler.next_batch()
+            if wait:
+                time.sleep(wait)
+            pmids_string = ','.join(batch_pmids)
+
+            # Prepare and send the request to PubTator using the PMIDs
+            url = export_url(export_format, pmids_string)
+            print(f"Submitting {len(batch_pmids)} PMIDs: {pmids_string}")
+
+            try:
+                # Send the request
+                started = time.monotonic()
+                response = session.get(url, stream=export_format == 'biocjson')
+
+                # Debugging: Log the response status code
+                print(f"Response status code: {response.status_code}")
+
+                if response.status_code == 200:
+                    # Successfully retrieved data
+                    if export_format == 'biocjson':
+                        # Parse the records while the body is still arriving
+                        response.raw.decode_content = True
+                        payload = list(iter_bioc_documents(response.raw))
+                        payload_bytes = response.raw.tell()
                     else:
-                        print(f"Error: HTTP {response.status_code} for PMIDs: {pmids_string}")
+                        payload = response.text
+                        payload_bytes = len(response.content)
+                    latency = time.monotonic() - started
+                    not_returned = store(batch_pmids, payload)
+                    scheduler.record_success(batch_pmids, latency, payload_bytes, not_returned)
+                else:
+                    print(f"Error: HTTP {response.status_code} for PMIDs: {pmids_string}")
+                    scheduler.record_failure(batch_pmids, f"HTTP {response.status_code}",
+                                             status=response.status_code)
+
+            except Exception as e:
+                print(f"Exception occurred for PMIDs: {pmids_string}: {str(e)}")
+                scheduler.record_failure(batch_pmids, str(e))
 
-                except Exception as e:
-                    print(f"Exception occurred for PMIDs: {pmids_string}: {str(e)}")
+            # Respect the 3 seconds delay
+            time.sleep(3)
 
-                # Respect the 3 seconds delay
-                time.sleep(3)
+
+def write_missing_report(scheduler, report_path):
+    scheduler.write_report(report_path)
+    report = scheduler.report()
+    print(f"Fetched {report['fetched']} of {report['requested']} PMIDs "
+          f"({len(report['failed'])} failed, {len(report['not_returned'])} not returned); "
+          f"report saved to {report_path}")
+
+
+def open_store(output_file_session_number, cache, export_format='pubtator'):
+    """Return the callback that persists each response, and the file to close afterwards."""
+    if cache is not None:
+        return (cache.store_records if export_format == 'biocjson' else cache.store_batch), None
+
+    output_file = open(output_file_session_number, 'w', encoding='utf-8')
+
+    def store(batch_pmids, annotations):
+        write_batch(output_file, batch_pmids, annotations)
+        documents = split_documents(annotations)
+        return [pmid for pmid in batch_pmids if pmid not in documents]
+
+    def store_records(batch_pmids, documents):
+        for document in documents:
+            output_file.write(document_to_json(document) + "\n")
+        output_file.flush()
+        returned = {document.pmid for document in documents}
+        return [pmid for pmid in batch_pmids if pmid not in returned]
+
+    return (store_records if export_format == 'biocjson' else store), output_file
+
+
+def normalizing(store, export_format='pubtator'):
+    """Wrap ``store`` so every response is Unicode-normalized once, at ingest."""
+    if export_format == 'biocjson':
+        return lambda batch_pmids, documents: store(batch_pmids, [normalize_document(document)
+                                                                  for document in documents])
+    return lambda batch_pmids, annotations: store(batch_pmids, normalize_text(annotations))
+
+
+def submit_pmids_request(input_file, bioconcept, output_file_session_number, cache_dir=None,
+                         report_path=None, export_format='pubtator', keep_unicode=False):
+    pmids = read_pmids(input_file)
+    cache = open_cache(cache_dir, export_format) if cache_dir is not None else None
+    scheduler = AdaptiveBatchScheduler(cache.missing(pmids) if cache else pmids,
+                                       initial_batch_size=BATCH_SIZE, max_batch_size=BATCH_SIZE)
+
+    store, output_file = open_store(output_file_session_number, cache, export_format)
+    if not keep_unicode:
+        store = normalizing(store, export_format)
+    try:
+        fetch_batches(scheduler, store, export_format)
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    if cache is not None:
+        assemble_from_cache(cache, pmids, output_file_session_number, export_format)
+    write_missing_report(scheduler, report_path or f"{output_file_session_number}.report.json")
+
+
+async def fetch_batch_async(session, limiter, pmids_string, export_format='pubtator'):
+    """Fetch one batch through the shared session once the limiter allows it.
+
+    Returns the status, the payload (text, or ``Document`` records in BioC-JSON
+    mode) and the payload size in bytes.
+    """
+    await limiter.acquire()
+    async with session.get(export_url(export_format, pmids_string)) as response:
+        if response.status != 200:
+            return response.status, None, 0
+        if export_format == 'biocjson':
+            documents = [document async for document in aiter_bioc_documents(response.content)]
+            return response.status, documents, response.content.total_bytes
+        body = await response.read()
+        return response.status, body.decode('utf-8'), len(body)
+
+
+async def fetch_batches_async(scheduler, store, concurrency=DEFAULT_CONCURRENCY,
+                              requests_per_second=DEFAULT_REQUESTS_PER_SECOND, export_format='pubtator'):
+    """Fetch scheduled batches with several requests in flight over pooled connections.
+
+    Successful responses are handed to ``store`` as they complete.
+    """
+    import aiohttp
+
+    limiter = TokenBucket(requests_per_second)
+
+    async def worker(session):
+        while not scheduler.finished():
+            scheduled = scheduler.next_batch()
+            if scheduled is None:
+                # Other workers still have batches in flight that may be requeued
+                await asyncio.sleep(0.1)
+                continue
+            batch_pmids, wait = scheduled
+            if wait:
+                await asyncio.sleep(wait)
+            pmids_string = ','.join(batch_pmids)
+            try:
+                started = time.monotonic()
+                status, payload, payload_bytes = await fetch_batch_async(session, limiter, pmids_string,
+                                                                         export_format)
+                latency = time.monotonic() - started
+                print(f"Response status code: {status} for {len(batch_pmids)} PMIDs")
+                if status == 200:
+                    not_returned = store(batch_pmids, payload)
+                    scheduler.record_success(batch_pmids, latency, payload_bytes, not_returned)
+                else:
+                    print(f"Error: HTTP {status} for PMIDs: {pmids_string}")
+                    scheduler.record_failure(batch_pmids, f"HTTP {status}", status=status)
+            except Exception as e:
+                print(f"Exception occurred for PMIDs: {pmids_string}: {str(e)}")
+                scheduler.record_failure(batch_pmids, str(e) or type(e).__name__)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+
+
+async def submit_pmids_request_async(input_file, bioconcept, output_file_session_number, cache_dir=None,
+                                     report_path=None, export_format='pubtator', keep_unicode=False,
+                                     concurrency=DEFAULT_CONCURRENCY,
+                                     requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+    """Async counterpart of ``submit_pmids_request`` producing the same output."""
+    pmids = read_pmids(input_file)
+    cache = open_cache(cache_dir, export_format) if cache_dir is not None else None
+    scheduler = AdaptiveBatchScheduler(cache.missing(pmids) if cache else pmids,
+                                       initial_batch_size=BATCH_SIZE, max_batch_size=BATCH_SIZE)
+
+    store, output_file = open_store(output_file_session_number, cache, export_format)
+    if not keep_unicode:
+        store = normalizing(store, export_format)
+    try:
+        await fetch_batches_async(scheduler, store, concurrency=concurrency,
+                                  requests_per_second=requests_per_second, export_format=export_format)
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    if cache is not None:
+        assemble_from_cache(cache, pmids, output_file_session_number, export_format)
+    write_missing_report(scheduler, report_path or f"{output_file_session_number}.report.json")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
-        print("Usage: python submit_pmids_request.py [Inputfile] [Bioconcept] [outputfile_SessionNumber]")
-        print("\t[Inputfile]: a file containing a list of PMIDs separated by newlines")
-        print("\t[Bioconcept]: Gene, Disease, Chemical, Species, Mutation, and All.")
-        print("\t[outputfile_SessionNumber]: output file to save session numbers and annotations.")
-        print("Example: python submit_pmids_request.py pmid_list.txt All SessionNumber.txt")
+    parser = argparse.ArgumentParser(
+        description="Export PubTator annotations for a list of PMIDs.",
+        epilog="Example: python submit_pmids_request.py pmid_list.txt All SessionNumber.txt")
+    parser.add_argument("input_file", help="a file containing a list of PMIDs separated by newlines")
+    parser.add_argument("bioconcept", help="Gene, Disease, Chemical, Species, Mutation, and All.")
+    parser.add_argument("output_file_session_number",
+                        help="output file to save session numbers and annotations.")
+    parser.add_argument("--format", dest="export_format", choices=EXPORT_FORMATS, default='pubtator',
+                        help="pubtator text export, or biocjson parsed into JSON-lines document records")
+    parser.add_argument("--keep-unicode", action="store_true",
+                        help="store text as received instead of mapping it through lib/unicode.txt")
+    parser.add_argument("--cache-dir",
+                        help="per-PMID cache directory; reruns only fetch PMIDs that are not cached yet")
+    parser.add_argument("--report",
+                        help="JSON report of PMIDs that could not be fetched "
+                             "(default: <outputfile_SessionNumber>.report.json)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="fetch several batches concurrently over pooled connections")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"batches in flight in async mode (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help=f"requests per second across all workers (default: {DEFAULT_REQUESTS_PER_SECOND})")
+    args = parser.parse_args()
+
+    if args.use_async:
+        asyncio.run(submit_pmids_request_async(args.input_file, args.bioconcept,
+                                               args.output_file_session_number,
+                                               cache_dir=args.cache_dir, report_path=args.report,
+                                               export_format=args.export_format,
+                                               keep_unicode=args.keep_unicode,
+                                               concurrency=args.concurrency,
+                                               requests_per_second=args.rate))
     else:
-        input_file = sys.argv[1]
-        bioconcept = sys.argv[2]
-        output_file_session_number = sys.argv[3]
-        submit_pmids_request(input_file, bioconcept, output_file_session_number)
+        submit_pmids_request(args.input_file, args.bioconcept, args.output_file_session_number,
+                             cache_dir=args.cache_dir, report_path=args.report,
+                             export_format=args.export_format, keep_unicode=args.keep_unicode)
@@ -1,8 +1,136 @@
 import requests
+import heapq
 import os
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-def submit_text_retrieve(input_folder, inputfile_session_number, output_folder):
+BASE_URL = "https://www.ncbi.nlm.nih.gov/CBBresearch/Lu/Demo/RESTful/retrieve.cgi"
+
+MAX_WORKERS = 8
+# Pending sessions are re-polled after 5s, 10s, 20s, ... up to 5 minutes apart
+INITIAL_POLL_DELAY = 5
+MAX_POLL_DELAY = 300
+MAX_POLLS = 20
+
+# The retrieve endpoint answers with this warning while a session is still running
+PENDING_MARKER = "The Result is not ready"
+
+thread_local = threading.local()
+
+
+def get_session():
+    # requests.Session is not thread-safe, so every worker keeps its own pool
+    if not hasattr(thread_local, "session"):
+        thread_local.session = requests.Session()
+    return thread_local.session
+
+
+def write_atomically(output_file_path, text):
+    """Write to a temp file in the same folder and rename it into place.
+
+    The rename is atomic, so a crash never leaves a partial file that the
+    ``os.path.exists`` check would later mistake for a finished result.
+    """
+    output_folder = os.path.dirname(output_file_path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=output_folder, prefix='.retrieve-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+            temp_file.write(text)
+        os.replace(temp_path, output_file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def is_pending(response):
+    return PENDING_MARKER in response.text
+
+
+def poll_session(session_number, output_file_path):
+    """Poll one session once; returns "finished", "pending" or "failed".
+
+    Any unexpected error (e.g. an OSError from a full disk while saving) fails
+    only this session instead of aborting the whole schedule.
+    """
+    try:
+        return _poll_session(session_number, output_file_path)
+    except Exception as e:
+        print(f"{session_number} : Failed - {type(e).__name__}: {e}")
+        return "failed"
+
+
+def _poll_session(session_number, output_file_path):
+    retrieve_url = f"{BASE_URL}?id={session_number}"
+    try:
+        response = get_session().get(retrieve_url)
+    except requests.RequestException as e:
+        print(f"{session_number} : Error retrieving results - {e}")
+        return "pending"
+
+    if response.status_code == 200 and not is_pending(response):
+        write_atomically(output_file_path, response.text)
+        print(f"{session_number} : Result is retrieved.")
+        return "finished"
+    if is_pending(response) or response.status_code >= 500:
+        return "pending"
+    print(f"{session_number} : Error retrieving results - HTTP {response.status_code} {response.reason}")
+    return "failed"
+
+
+def retrieve_sessions(jobs, max_workers=MAX_WORKERS):
+    """Retrieve sessions on a bounded pool, re-polling pending ones with backoff.
+
+    A pending session goes back on a schedule instead of holding a worker while
+    it waits, so finished sessions keep every worker busy.  Returns the number
+    of sessions retrieved.
+    """
+    # (next poll time, tie-breaker, session number, output path, delay, polls so far)
+    schedule = [(0.0, i, session_number, path, INITIAL_POLL_DELAY, 0)
+                for i, (session_number, path) in enumerate(jobs)]
+    heapq.heapify(schedule)
+    sequence = len(schedule)
+    retrieved = 0
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+        while schedule or in_flight:
+            now = time.monotonic()
+            while schedule and schedule[0][0] <= now and len(in_flight) < max_workers:
+                entry = heapq.heappop(schedule)
+                in_flight[executor.submit(poll_session, entry[2], entry[3])] = entry
+
+            if not in_flight:
+                time.sleep(schedule[0][0] - now)
+                continue
+
+            timeout = max(0.0, schedule[0][0] - now) if schedule else None
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                _, _, session_number, path, delay, polls = in_flight.pop(future)
+                status = future.result()
+                if status == "finished":
+                    retrieved += 1
+                elif status == "failed":
+                    failed.append(session_number)
+                elif status == "pending":
+                    if polls + 1 >= MAX_POLLS:
+                        print(f"{session_number} : Gave up after {MAX_POLLS} polls")
+                        continue
+                    print(f"{session_number} : Result is not ready, retrying in {delay}s")
+                    sequence += 1
+                    heapq.heappush(schedule, (time.monotonic() + delay, sequence, session_number, path,
+                                              min(delay * 2, MAX_POLL_DELAY), polls + 1))
+
+    if failed:
+        print(f"Failed sessions: {', '.join(failed)}")
+    return retrieved
+
+
+def submit_text_retrieve(input_folder, inputfile_session_number, output_folder, max_workers=MAX_WORKERS):
     # Ensure output directory exists
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
@@ -14,29 +142,25 @@ def submit_text_retrieve(input_folder, inputfile_session_number, output_folder):
             if line:
                 session_number, input_filename = line.split("\t")
                 sn_hash[session_number] = input_filename
-    
-    base_url = "https://www.ncbi.nlm.nih.gov/CBBresearch/Lu/Demo/RESTful/retrieve.cgi"
-    
+
+    jobs = []
     for session_number, input_filename in sn_hash.items():
         output_file_path = os.path.join(output_folder, input_filename)
         if os.path.exists(output_file_path):
             print(f"{output_file_path} - finished")
             continue
+        jobs.append((session_number, output_file_path))
+
+    retrieved = retrieve_sessions(jobs, max_workers)
+    print(f"Retrieved {retrieved} of {len(jobs)} sessions")
 
-        retrieve_url = f"{base_url}?id={session_number}"
-        response = requests.get(retrieve_url)
-        if response.status_code == 200:
-            with open(output_file_path, 'w', encoding='utf-8') as output_file:
-                output_file.write(response.text)
-            print(f"{session_number} : Result is retrieved.")
-        else:
-            print(f"{session_number} : Error retrieving results - {response.status_line}")
 
 if __name__ == "__main__":
     if len(sys.argv) < 4:
-        print("\nUsage: python submit_text_retrieve.py [InputFolder] [InputFileSessionNumber] [OutputFolder]\n")
+        print("\nUsage: python submit_text_retrieve.py [InputFolder] [InputFileSessionNumber] [OutputFolder] [MaxWorkers]\n")
     else:
         input_folder = sys.argv[1]
         inputfile_session_number = sys.argv[2]
         output_folder = sys.argv[3]
-        submit_text_retrieve(input_folder, inputfile_session_number, output_folder)
+        max_workers = int(sys.argv[4]) if len(sys.argv) > 4 else MAX_WORKERS
+        submit_text_retrieve(input_folder, inputfile_session_number, output_folder, max_workers)
@@ -1,21 +1,18 @@
-import spacy
 import re
 from collections import defaultdict
 
-# Load a SpaCy model
-nlp = spacy.load("en_core_web_sm")
+from nlp_resources import get_nlp
+from pubtator_documents import iter_documents
+from text_stats import abstract_stats
 
 
-def parse_pubtator_file(file_path):
-    data = {}
-
-    # Read the contents of the file
-    with open(file_path, 'r', encoding='utf-8') as file:
-        pubtator_text = file.read()
-
-    # Split the input into lines for processing
-    lines = pubtator_text.strip().split('\n')
+def parse_pubtator_file(file_path, stats_cache=None, stats_mode='parser', n_process=1):
+    """Summarize ``file_path``.
 
+    With ``stats_cache``, tokens and sentences are counted by ``text_stats``:
+    abstracts go through a pruned pipeline with ``nlp.pipe`` in ``n_process``
+    processes and the per-PMID counts are cached for the next run.
+    """
     # Initialize counters and structures for the summary
     pmids = set()  # To store unique PMIDs
     tokens_count = 0
@@ -25,42 +22,29 @@ def parse_pubtator_file(file_path):
     entities_by_type = defaultdict(int)
     relations_by_type = defaultdict(int)
 
-    current_abstract = None
-
-    # Iterate through the lines to extract titles, abstracts, and annotations
-    for line in lines:
-        if '\t' not in line:  # This is an empty line or header
-            continue
+    # Iterate through the articles to extract abstracts and annotations
+    for document in iter_documents(file_path):
+        pmids.add(document.pmid)  # Add PMID to the set for unique count
 
-        # Handle abstracts
-        if '|a|' in line:
-            pmid, _, abstract = line.partition('|a|')
-            pmid = pmid.strip()
-            abstract = abstract.strip()
-            pmids.add(pmid)  # Add PMID to the set for unique count
-
-            # Process the abstract with SpaCy
-            doc = nlp(abstract)
+        # Process the abstract with SpaCy
+        if stats_cache is None:
+            doc = get_nlp()(document.abstract.strip())
             tokens_count += len(doc)  # Count tokens
             sentences_count += len(list(doc.sents))  # Count sentences
 
-            current_abstract = abstract  # Store the current abstract for future use
-            continue
-
-        # Handle annotations (tab-separated)
-        parts = line.split('\t')
-
-        if len(parts) >= 5:  # Expecting at least PMID, start, end, entity, entity type
-            entity_type = parts[4].strip()
+        for entity in document.entities:
             entities_count += 1  # Increment total entity count
-            entities_by_type[entity_type] += 1  # Increment specific entity type count
+            entities_by_type[entity.type] += 1  # Increment specific entity type count
 
-        # Handle relations
-        elif len(parts) >= 3:  # Expecting at least PMID, relation type, and at least one more part
-            if parts[1].strip():  # Check if the relation type is not empty
-                relation_type = parts[1].strip()
+        for relation in document.relations:
+            if relation.type:  # Check if the relation type is not empty
                 relations_count += 1  # Increment total relation count
-                relations_by_type[relation_type] += 1  # Increment specific relation type count
+                relations_by_type[relation.type] += 1  # Increment specific relation type count
+
+    if stats_cache is not None:
+        stats = abstract_stats(iter_documents(file_path), stats_cache, stats_mode, n_process=n_process)
+        tokens_count = sum(tokens for tokens, _ in stats.values())
+        sentences_count = sum(sentences for _, sentences in stats.values())
 
     # Prepare the final data summary
     summary = {
@@ -75,7 +59,13 @@ def parse_pubtator_file(file_path):
 
     return summary
 
-# Example usage
-file_path = 'neurodegenerative-disease/SessionNumber.txt'  # Update with the actual file path
-parsed_data = parse_pubtator_file(file_path)
-print(parsed_data)
+
+def main():
+    # Example usage
+    file_path = 'neurodegenerative-disease/SessionNumber.txt'  # Update with the actual file path
+    parsed_data = parse_pubtator_file(file_path)  # Add stats_cache='text_stats.sqlite' to batch and cache the NLP
+    print(parsed_data)
+
+
+if __name__ == "__main__":
+    main()
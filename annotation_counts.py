@@ -1,5 +1,11 @@
 import re
-from collections import defaultdict
+from array import array
+from collections import Counter
+from functools import partial
+
+from parallel_counts import count_in_parallel
+from pubtator_documents import iter_documents
+from term_matcher import TermMatcher
 
 # Define sets of terms for each entity type, using regular expressions for variations
 neurodegenerative_terms = {
@@ -32,51 +38,79 @@ perceiver_terms = {
 }
 
 
-def process_article_file(input_file_path, output_counts_path):
-    # Initialize counters for each entity type
-    neurodegenerative_counts = defaultdict(int)
-    olfactory_counts = defaultdict(int)
-    smell_test_counts = defaultdict(int)
-    smell_source_counts = defaultdict(int)
-    perceiver_counts = defaultdict(int)
-
-    with open(input_file_path, 'r', encoding='utf-8') as file:
-        # Split file into individual articles
-        articles = file.read().strip().split('\n\n')
-
-        for article in articles:
-            # Initialize variables for the title and abstract
-            title = ''
-            abstract = ''
-
-            # Process each line in the article
-            for line in article.splitlines():
-                if '|t|' in line:
-                    title = line.split('|t|')[1].strip().lower()
-                elif '|a|' in line:
-                    abstract = line.split('|a|')[1].strip().lower()
-
-            # Combine title and abstract for analysis
-            text = f"{title} {abstract}"
-
-            # Strip punctuation using regex
-            text = re.sub(r'[^\w\s]', '', text)
-
-            # Count terms for each entity type
-            for term in neurodegenerative_terms:
-                neurodegenerative_counts[term] += len(re.findall(term, text))
-
-            for term in olfactory_terms:
-                olfactory_counts[term] += len(re.findall(term, text))
-
-            for term in smell_test_terms:
-                smell_test_counts[term] += len(re.findall(term, text))
-
-            for term in smell_source_terms:
-                smell_source_counts[term] += len(re.findall(term, text))
+TERM_CATEGORIES = {
+    'neurodegenerative': neurodegenerative_terms,
+    'olfactory': olfactory_terms,
+    'smell_test': smell_test_terms,
+    'smell_source': smell_source_terms,
+    'perceiver': perceiver_terms,
+}
 
-            for term in perceiver_terms:
-                perceiver_counts[term] += len(re.findall(term, text))
+# Every term of every category, matched in a single scan of each article
+term_matcher = TermMatcher(TERM_CATEGORIES)
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+# Columns of the term matrix: each distinct term once, in category order and sorted within a
+# category.  Set iteration order depends on the per-process string hash seed, so it must not
+# decide the columns: spawned workers and later runs have to agree with the parent.
+MATRIX_TERMS = list(dict.fromkeys(term for terms in TERM_CATEGORIES.values() for term in sorted(terms)))
+MATRIX_COLUMNS = {term: column for column, term in enumerate(MATRIX_TERMS)}
+
+
+def count_documents(documents, with_matrix=False):
+    """Count term matches in one stream of articles; merges with ``parallel_counts.merge_counts``.
+
+    With ``with_matrix`` the per-article term counts are kept as well, as the
+    rows of a sparse articles x terms matrix.
+    """
+    # Initialize counters for each entity type, listing every term even when it never matches;
+    # sorted so terms with equal counts are written in the same order in every process
+    counts = {category: Counter({term: 0 for term in sorted(terms)}) for category, terms in TERM_CATEGORIES.items()}
+    if with_matrix:
+        counts['matrix'] = {'pmids': array('q'), 'row_lengths': array('q'), 'indices': array('l'),
+                            'data': array('l')}
+
+    for document in documents:
+        # Combine title and abstract for analysis
+        text = f"{document.title.strip().lower()} {document.abstract.strip().lower()}"
+
+        # Strip punctuation using regex
+        text = PUNCTUATION.sub('', text)
+
+        # Count terms for each entity type
+        term_counts = term_matcher.count_by_category(text, counts)
+
+        if with_matrix:
+            rows = counts['matrix']
+            rows['pmids'].append(int(document.pmid))
+            rows['row_lengths'].append(len(term_counts))
+            for column in sorted(MATRIX_COLUMNS[term] for term in term_counts):
+                rows['indices'].append(column)
+                rows['data'].append(term_counts[MATRIX_TERMS[column]])
+
+    return counts
+
+
+def process_article_file(input_file_path, output_counts_path, processes=1, matrix_path=None):
+    # Count serially, or over article-aligned shards in a process pool
+    count_shard = partial(count_documents, with_matrix=matrix_path is not None)
+    if processes == 1:
+        counts = count_shard(iter_documents(input_file_path))
+    else:
+        counts = count_in_parallel(input_file_path, count_shard, processes)
+
+    # Save the per-article counts as an articles x terms sparse matrix (see term_matrix.py)
+    if matrix_path is not None:
+        from term_matrix import save_term_matrix
+        categories = {category: [MATRIX_COLUMNS[term] for term in terms]
+                      for category, terms in TERM_CATEGORIES.items()}
+        save_term_matrix(matrix_path, terms=MATRIX_TERMS, categories=categories, **counts['matrix'])
+
+    neurodegenerative_counts = counts['neurodegenerative']
+    olfactory_counts = counts['olfactory']
+    smell_test_counts = counts['smell_test']
+    smell_source_counts = counts['smell_source']
+    perceiver_counts = counts['perceiver']
 
     # Calculate total counts for each entity type
     total_neurodegenerative = sum(neurodegenerative_counts.values())
@@ -115,7 +149,14 @@ def process_article_file(input_file_path, output_counts_path):
     # Debug print to verify functionality
     print("Counts calculated, totals computed, and results saved to output.")
 
-# Example usage
-input_file_path = 'output_subset.txt'  # Path to your subset file
-output_counts_path = 'entity_counts.txt'  # Output path for counts
-process_article_file(input_file_path, output_counts_path)
+
+def main():
+    # Example usage
+    input_file_path = 'output_subset.txt'  # Path to your subset file
+    output_counts_path = 'entity_counts.txt'  # Output path for counts
+    process_article_file(input_file_path, output_counts_path)  # Add processes=N to count shards in N processes
+    # Add matrix_path='term_matrix.npz' to also save the articles x terms matrix
+
+
+if __name__ == "__main__":
+    main()
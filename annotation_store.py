@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import sys
+from array import array
+
+import numpy as np
+
+from pubtator_documents import iter_documents
+
+# Column name -> (array typecode used while building, NumPy dtype on disk)
+ENTITY_COLUMNS = {
+    'entity_pmid': ('q', np.int64),
+    'entity_start': ('l', np.int32),
+    'entity_end': ('l', np.int32),
+    'entity_type': ('l', np.int32),
+    'entity_concept': ('l', np.int32),
+    'entity_mention': ('l', np.int32),
+}
+RELATION_COLUMNS = {
+    'relation_pmid': ('q', np.int64),
+    'relation_type': ('l', np.int32),
+    'relation_concept_1': ('l', np.int32),
+    'relation_concept_2': ('l', np.int32),
+}
+DOCUMENT_COLUMNS = {
+    'document_pmid': ('q', np.int64),
+    # Index of each document's first entity; entities of document i are
+    # entity_offsets[i]:entity_offsets[i + 1]
+    'entity_offsets': ('q', np.int64),
+}
+DICTIONARIES = ('types', 'concepts', 'mentions', 'relation_types')
+
+# Flush column buffers to disk every this many values to keep memory flat
+FLUSH_EVERY = 1 << 20
+
+
+class _ColumnWriter:
+    """Appends values to a raw temp file and finishes it as a ``.npy`` array."""
+
+    def __init__(self, store_dir, name, typecode, dtype):
+        self.path = os.path.join(store_dir, f"{name}.npy")
+        self.raw_path = self.path + '.raw'
+        self.raw_file = open(self.raw_path, 'wb')
+        self.buffer = array(typecode)
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+
+    def append(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        np.asarray(self.buffer, dtype=self.dtype).tofile(self.raw_file)
+        self.length += len(self.buffer)
+        self.buffer = array(self.buffer.typecode)
+
+    def close(self):
+        self.flush()
+        self.raw_file.close()
+        header = {'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False,
+                  'shape': (self.length,)}
+        with open(self.path, 'wb') as npy_file, open(self.raw_path, 'rb') as raw_file:
+            np.lib.format.write_array_header_1_0(npy_file, header)
+            shutil.copyfileobj(raw_file, npy_file)
+        os.remove(self.raw_path)
+
+
+class _Interner:
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def build_annotation_store(file_path, store_dir):
+    """Convert a PubTator (or JSON-lines record) corpus into a columnar store.
+
+    Annotations become NumPy arrays with types, concept IDs and mention texts
+    interned into string dictionaries.  The corpus is streamed, so it never
+    has to fit in memory.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    columns = {name: _ColumnWriter(store_dir, name, typecode, dtype)
+               for name, (typecode, dtype) in {**ENTITY_COLUMNS, **RELATION_COLUMNS,
+                                               **DOCUMENT_COLUMNS}.items()}
+    dictionaries = {name: _Interner() for name in DICTIONARIES}
+
+    entity_count = 0
+    for document in iter_documents(file_path):
+        pmid = int(document.pmid)
+        columns['document_pmid'].append(pmid)
+        columns['entity_offsets'].append(entity_count)
+
+        for entity in document.entities:
+            columns['entity_pmid'].append(pmid)
+            columns['entity_start'].append(entity.start)
+            columns['entity_end'].append(entity.end)
+            columns['entity_type'].append(dictionaries['types'].code(entity.type))
+            columns['entity_concept'].append(dictionaries['concepts'].code(entity.concept_id))
+            columns['entity_mention'].append(dictionaries['mentions'].code(entity.text))
+        entity_count += len(document.entities)
+
+        for relation in document.relations:
+            columns['relation_pmid'].append(pmid)
+            columns['relation_type'].append(dictionaries['relation_types'].code(relation.type))
+            # Relation concepts share the entity concept dictionary
+            columns['relation_concept_1'].append(dictionaries['concepts'].code(relation.concept_1))
+            columns['relation_concept_2'].append(dictionaries['concepts'].code(relation.concept_2))
+
+    columns['entity_offsets'].append(entity_count)
+    for column in columns.values():
+        column.close()
+
+    for name, interner in dictionaries.items():
+        with open(os.path.join(store_dir, f"{name}.json"), 'w', encoding='utf-8') as dictionary_file:
+            json.dump(interner.values, dictionary_file, ensure_ascii=False)
+
+    return AnnotationStore(store_dir)
+
+
+class AnnotationStore:
+    """Read-only, memory-mapped view of a store written by ``build_annotation_store``."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        for name in {**ENTITY_COLUMNS, **RELATION_COLUMNS, **DOCUMENT_COLUMNS}:
+            setattr(self, name, np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode='r'))
+        self._dictionaries = {}
+        self._codes = {}
+
+    def dictionary(self, name):
+        """Return the list of strings whose index is the stored code."""
+        if name not in self._dictionaries:
+            with open(os.path.join(self.store_dir, f"{name}.json"), 'r', encoding='utf-8') as dictionary_file:
+                self._dictionaries[name] = json.load(dictionary_file)
+        return self._dictionaries[name]
+
+    def codes_for(self, name, values):
+        """Map strings to their codes, skipping strings that never occur."""
+        if name not in self._codes:
+            self._codes[name] = {value: code for code, value in enumerate(self.dictionary(name))}
+        codes = self._codes[name]
+        return np.array([codes[value] for value in values if value in codes], dtype=np.int32)
+
+    def entity_mask(self, concept_ids):
+        """Boolean mask over all entities whose concept ID is in ``concept_ids``."""
+        return np.isin(self.entity_concept, self.codes_for('concepts', concept_ids))
+
+    def relation_mask(self, concept_ids, position=1):
+        column = self.relation_concept_1 if position == 1 else self.relation_concept_2
+        return np.isin(column, self.codes_for('concepts', concept_ids))
+
+    def pmids_with(self, concept_ids):
+        """Sorted unique PMIDs of the articles mentioning any of ``concept_ids``."""
+        return np.unique(self.entity_pmid[self.entity_mask(concept_ids)])
+
+    def relation_counts(self, mask):
+        """{relation type: count} for the relations selected by ``mask``."""
+        counts = np.bincount(self.relation_type[mask], minlength=len(self.dictionary('relation_types')))
+        return {relation_type: int(count)
+                for relation_type, count in zip(self.dictionary('relation_types'), counts) if count}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python annotation_store.py [input_file] [store_dir]")
+        print("\t[input_file]: PubTator file (or JSON-lines records) to convert")
+        print("\t[store_dir]: directory for the memory-mappable columnar store")
+    else:
+        build_annotation_store(sys.argv[1], sys.argv[2])
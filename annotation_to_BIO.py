@@ -1,11 +1,12 @@
+import os
 import re
-import random
-from sklearn.model_selection import train_test_split
-import nltk
-from nltk.tokenize import sent_tokenize
+from contextlib import ExitStack
 
-# Ensure you download the required NLTK resources
-nltk.download('punkt')
+from bio_writer import BIOFile, document_fold, fold_path, is_test_document
+from nlp_resources import download_punkt, load_punkt, sent_tokenize
+from parallel_counts import imap_ordered, iter_range_documents, process_pool, shard_ranges
+from phrase_tagger import PhraseTagger
+from pubtator_documents import iter_documents
 
 # Define sets of terms for each entity type, using regular expressions for variations
 neurodegenerative_terms = {
@@ -34,137 +35,124 @@ perceiver_terms = {
     r'\bhuman\b', r'\bsubjects\b', r'\bwomen\b', r'\bmen\b', r'\bpatients\b', r'\bpatient\b'
 }
 
+# Approximate input bytes per batch of articles sent to a worker
+BATCH_BYTES = 1 << 18
+# Batches per worker that may be in flight or waiting to be written
+QUEUE_DEPTH = 2
+
+# Entity label of each term set; a phrase listed under two labels gets the first one
+ENTITY_TERMS = {
+    'NEURODEGENERATIVE': neurodegenerative_terms,
+    'OLFACTORY': olfactory_terms,
+    'SMELL_TEST': smell_test_terms,
+    'SMELL_SOURCE': smell_source_terms,
+    'PERCIEVER': perceiver_terms,
+}
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def clean_text(text):
+    """Lowercase and remove punctuation, as done to every sentence before tagging."""
+    return PUNCTUATION.sub('', text).lower()
+
+
+# Term words are cleaned like the text, so "sniffin' sticks" and "n-butanol" can match
+tagger = PhraseTagger(ENTITY_TERMS, normalize_word=clean_text)
+
+
 def tag_entities(text):
     """Tag entities in the given text using the BIO format, including I- tags for multi-word entities."""
-    tags = []
     words = text.split()
-
-    # Initialize a set to keep track of current entity tags
-    current_entity = None
-
-    # Tagging function for each entity type
-    for word in words:
-        lower_word = word.lower()
-        found_tag = False
-
-        for term in neurodegenerative_terms:
-            if re.fullmatch(term, lower_word):
-                if current_entity == 'B-NEURODEGENERATIVE':
-                    tags.append((word, 'I-NEURODEGENERATIVE'))
-                else:
-                    tags.append((word, 'B-NEURODEGENERATIVE'))
-                    current_entity = 'B-NEURODEGENERATIVE'
-                found_tag = True
-                break
-        if not found_tag:
-            for term in olfactory_terms:
-                if re.fullmatch(term, lower_word):
-                    if current_entity == 'B-OLFACTORY':
-                        tags.append((word, 'I-OLFACTORY'))
-                    else:
-                        tags.append((word, 'B-OLFACTORY'))
-                        current_entity = 'B-OLFACTORY'
-                    found_tag = True
-                    break
-        if not found_tag:
-            for term in smell_test_terms:
-                if re.fullmatch(term, lower_word):
-                    if current_entity == 'B-SMELL_TEST':
-                        tags.append((word, 'I-SMELL_TEST'))
-                    else:
-                        tags.append((word, 'B-SMELL_TEST'))
-                        current_entity = 'B-SMELL_TEST'
-                    found_tag = True
-                    break
-        if not found_tag:
-            for term in smell_source_terms:
-                if re.fullmatch(term, lower_word):
-                    if current_entity == 'B-SMELL_SOURCE':
-                        tags.append((word, 'I-SMELL_SOURCE'))
-                    else:
-                        tags.append((word, 'B-SMELL_SOURCE'))
-                        current_entity = 'B-SMELL_SOURCE'
-                    found_tag = True
-                    break
-        if not found_tag:
-            for term in perceiver_terms:
-                if re.fullmatch(term, lower_word):
-                    if current_entity == 'B-PERCIEVER':
-                        tags.append((word, 'I-PERCIEVER'))
-                    else:
-                        tags.append((word, 'B-PERCIEVER'))
-                        current_entity = 'B-PERCIEVER'
-                    found_tag = True
-                    break
-
-        if not found_tag:
-            tags.append((word, 'O'))  # Outside any entity
-            current_entity = None  # Reset current entity
-
-    return tags
-
-
-def process_article_file(input_file_path, output_tags_path, train_file_path, test_file_path, test_size=0.2):
-    """Process the article file to extract and tag entities, and split into train/test sets."""
-    all_tags = []
-
-    with open(input_file_path, 'r', encoding='utf-8') as file:
-        # Split file into individual articles
-        articles = file.read().strip().split('\n\n')
-
-        for article in articles:
-            # Initialize variables for the title and abstract
-            title = ''
-            abstract = ''
-
-            # Process each line in the article
-            for line in article.splitlines():
-                if '|t|' in line:
-                    title = line.split('|t|')[1].strip()
-                elif '|a|' in line:
-                    abstract = line.split('|a|')[1].strip()
-
-            # Combine title and abstract for analysis
-            text = f"{title} {abstract}"
-
-            # Split text into sentences using NLTK
-            sentences = sent_tokenize(text)
-
-            # Tag entities in each sentence
-            for sentence in sentences:
-                # Lowercase and remove punctuation for each sentence before tagging
-                cleaned_sentence = re.sub(r'[^\w\s]', '', sentence).lower()
-                tags = tag_entities(cleaned_sentence)
-                all_tags.append(tags)
-
-    # Write train tags to train output file with blank lines separating sentences
-    with open(train_file_path, 'w', encoding='utf-8') as train_file:
-        for tags in all_tags:
-            for word, tag in tags:
-                train_file.write(f"{word}\t{tag}\n")
-            train_file.write("\n")  # Add a blank line to separate sentences
-
-    # Write test tags to test output file with blank lines separating sentences
-    with open(test_file_path, 'w', encoding='utf-8') as test_file:
-        for tags in all_tags:
-            for word, tag in tags:
-                test_file.write(f"{word}\t{tag}\n")
-            test_file.write("\n")  # Add a blank line to separate sentences
-
-    # Write all tags to the main output file with blank lines separating sentences
-    with open(output_tags_path, 'w', encoding='utf-8') as output_file:
-        for tags in all_tags:
-            for word, tag in tags:
-                output_file.write(f"{word}\t{tag}\n")
-            output_file.write("\n")  # Add a blank line to separate sentences
+    return tagger.tag(words, [word.lower() for word in words])
+
+
+def tag_document(document):
+    """Split a document's title and abstract into sentences and BIO-tag each of them."""
+    # Combine title and abstract for analysis
+    text = f"{document.title.strip()} {document.abstract.strip()}"
+
+    # Split text into sentences using NLTK (Punkt is downloaded on first use if missing), then
+    # lowercase and remove punctuation for each sentence before tagging
+    return [tag_entities(clean_text(sentence)) for sentence in sent_tokenize(text)]
+
+
+def _tag_range(task):
+    file_path, start, end = task
+    return [(document.pmid, tag_document(document)) for document in iter_range_documents(file_path, start, end)]
+
+
+def iter_tagged_documents(input_file_path, processes=1):
+    """Stream (pmid, tagged sentences) for every document of ``input_file_path``, in file order.
+
+    With ``processes`` other than 1 (None for every core), batches of
+    articles of about ``BATCH_BYTES`` are segmented and tagged in a process
+    pool whose workers load Punkt at startup (downloaded beforehand here).  Each worker reads its own
+    batch from the file, and at most ``QUEUE_DEPTH`` batches per worker are
+    pending at a time, so memory stays flat however large the corpus is.
+    """
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        for document in iter_documents(input_file_path):
+            yield document.pmid, tag_document(document)
+        return
+
+    shard_count = max(processes, os.path.getsize(input_file_path) // BATCH_BYTES)
+    tasks = ((input_file_path, start, end) for start, end in shard_ranges(input_file_path, shard_count))
+    # Download Punkt here, once, so the workers only have to load it
+    download_punkt()
+    with process_pool(processes, initializer=load_punkt) as pool:
+        for batch in imap_ordered(pool, _tag_range, tasks, processes * QUEUE_DEPTH):
+            yield from batch
+
+
+def process_article_file(input_file_path, output_tags_path, train_file_path, test_file_path, test_size=0.2,
+                         folds=None, shard_size=None, compress=False, processes=1):
+    """Tag entities and write them as they are produced, split into train/test sets by document.
+
+    Each document goes to the test set when its PMID hashes below
+    ``test_size``, so the split is reproducible and needs no list of the
+    corpus.  With ``folds`` the documents are instead written to ``folds``
+    files next to ``output_tags_path`` (``entity_tags.fold0.txt``, ...) for
+    k-fold cross-validation, and no train/test files are written.
+    ``output_tags_path`` (every sentence) may be None to skip it.
+    ``shard_size`` and ``compress`` are passed to ``bio_writer.BIOFile`` and
+    ``processes`` to ``iter_tagged_documents``.
+    """
+    def bio_file(path):
+        return outputs.enter_context(BIOFile(path, shard_size=shard_size, compress=compress))
+
+    with ExitStack() as outputs:
+        all_file = bio_file(output_tags_path) if output_tags_path else None
+        if folds:
+            fold_files = [bio_file(fold_path(output_tags_path or train_file_path, fold)) for fold in range(folds)]
+        else:
+            train_file, test_file = bio_file(train_file_path), bio_file(test_file_path)
+
+        for pmid, sentences in iter_tagged_documents(input_file_path, processes):
+            if all_file is not None:
+                all_file.write_document(sentences)
+            if folds:
+                fold_files[document_fold(pmid, folds)].write_document(sentences)
+            elif is_test_document(pmid, test_size):
+                test_file.write_document(sentences)
+            else:
+                train_file.write_document(sentences)
 
     # Debug print to verify functionality
     print("Entities tagged, train/test sets created, and results saved to output files.")
 
 
-# Example usage
-input_file_path = 'output_subset.txt'  # Path to your subset file
-output_tags_path = 'entity_tags.txt'  # Output path for all tags
-train_file_path = 'train_tags.txt'  # Output path for training tags
-test_file_path = 'test_tags.txt'  # Output path for testing tags
-process_article_file(input_file_path, output_tags_path, train_file_path, test_file_path)
+def main():
+    # Example usage
+    input_file_path = 'output_subset.txt'  # Path to your subset file
+    output_tags_path = 'entity_tags.txt'  # Output path for all tags
+    train_file_path = 'train_tags.txt'  # Output path for training tags
+    test_file_path = 'test_tags.txt'  # Output path for testing tags
+    # folds=5 writes entity_tags.fold0.txt .. fold4.txt instead of train/test files;
+    # shard_size=1000 starts a new file every 1000 documents; compress=True gzips them;
+    # processes=None tags on every core
+    process_article_file(input_file_path, output_tags_path, train_file_path, test_file_path, test_size=0.2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import json
+import sqlite3
+from collections import defaultdict
+from functools import lru_cache
+
+from knowledge_base import DEFAULT_DATABASE_PATH
+from pubtator_documents import NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID
+
+# Names usable in place of concept IDs, on the command line and in the API
+CONCEPT_GROUPS = {
+    'neurodegenerative': NEURODEGENERATIVE_IDS,
+    'alzheimer': ('MESH:D000544',),
+    'parkinson': ('MESH:D010300',),
+    'smell_disorder': (SMELL_DISORDER_ID,),
+}
+
+DEFAULT_CACHE_SIZE = 256
+
+
+def concept_ids(concepts):
+    """Expand group names and return the concept IDs as a sorted tuple.
+
+    The canonical order makes {'a', 'b'} and ['b', 'a'] hit the same cache entry.
+    """
+    if isinstance(concepts, str):
+        concepts = concepts.split(',')
+    expanded = set()
+    for concept in concepts:
+        expanded.update(CONCEPT_GROUPS.get(concept, (concept,)))
+    return tuple(sorted(expanded))
+
+
+def _placeholders(values):
+    return ','.join('?' * len(values))
+
+
+class AssociationQueries:
+    """Read-only queries over the knowledge base built by ``knowledge_base.py``.
+
+    Results of recent queries are kept in an LRU cache of ``cache_size``
+    entries.  The cache is dropped whenever another connection changes the
+    database (e.g. the loader rebuilds it), so results never go stale.
+    """
+
+    def __init__(self, database_path=DEFAULT_DATABASE_PATH, cache_size=DEFAULT_CACHE_SIZE):
+        self.connection = sqlite3.connect(database_path)
+        self._query = lru_cache(maxsize=cache_size)(self._execute)
+        self._data_version = self._current_data_version()
+
+    def close(self):
+        self.connection.close()
+
+    def _current_data_version(self):
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _execute(self, sql, parameters):
+        return tuple(self.connection.execute(sql, parameters).fetchall())
+
+    def query(self, sql, parameters=()):
+        """Run ``sql`` through the cache and return its rows as a tuple."""
+        data_version = self._current_data_version()
+        if data_version != self._data_version:
+            self._query.cache_clear()
+            self._data_version = data_version
+        return self._query(sql, tuple(parameters))
+
+    def cache_info(self):
+        return self._query.cache_info()
+
+    def co_occurrence(self, concepts, other_concepts, by_year=False):
+        """Articles mentioning a concept of each group, e.g. co_occurrence('parkinson', 'smell_disorder')."""
+        # Co-occurrence is symmetric: order the groups so both argument orders share a cache entry
+        first, second = sorted((concept_ids(concepts), concept_ids(other_concepts)))
+        pmids_sql = (f"SELECT pmid FROM mentions WHERE concept_id IN ({_placeholders(first)}) "
+                     f"INTERSECT SELECT pmid FROM mentions WHERE concept_id IN ({_placeholders(second)})")
+        if by_year:
+            rows = self.query(f"SELECT articles.year, COUNT(*) FROM ({pmids_sql}) AS matches "
+                              f"LEFT JOIN articles USING (pmid) GROUP BY articles.year ORDER BY articles.year",
+                              first + second)
+            return {'articles': sum(count for _, count in rows),
+                    'by_year': {str(year) if year else 'unknown': count for year, count in rows}}
+        pmids = [pmid for pmid, in self.query(pmids_sql + " ORDER BY pmid", first + second)]
+        return {'articles': len(pmids), 'pmids': pmids}
+
+    def relations(self, concepts, other_concepts=None, relation_type=None):
+        """Relations involving ``concepts`` (and ``other_concepts`` on the other side, if given)."""
+        first = concept_ids(concepts)
+        if other_concepts is None:
+            where = f"(concept_1 IN ({_placeholders(first)}) OR concept_2 IN ({_placeholders(first)}))"
+            parameters = first + first
+        else:
+            second = concept_ids(other_concepts)
+            where = (f"((concept_1 IN ({_placeholders(first)}) AND concept_2 IN ({_placeholders(second)})) "
+                     f"OR (concept_1 IN ({_placeholders(second)}) AND concept_2 IN ({_placeholders(first)})))")
+            parameters = first + second + second + first
+        if relation_type:
+            where += " AND type = ?"
+            parameters += (relation_type,)
+
+        rows = self.query(f"SELECT pmid, type, concept_1, concept_2 FROM relations WHERE {where} "
+                          f"ORDER BY pmid, type, concept_1, concept_2", parameters)
+        counts = defaultdict(int)
+        for _, found_type, _, _ in rows:
+            counts[found_type] += 1
+        return {'relations': len(rows), 'counts': dict(counts),
+                'details': [{'pmid': pmid, 'type': found_type, 'concept_1': concept_1, 'concept_2': concept_2}
+                            for pmid, found_type, concept_1, concept_2 in rows]}
+
+    def top_mentions(self, concepts, n=10, cooccurring_with=None, by_year=False):
+        """Most frequent (lowercased) mention texts of ``concepts``.
+
+        With ``cooccurring_with``, only articles that also mention one of those
+        concepts count; with ``by_year``, the top ``n`` is computed per year.
+        """
+        first = concept_ids(concepts)
+        where = f"mentions.concept_id IN ({_placeholders(first)})"
+        parameters = first
+        if cooccurring_with is not None:
+            second = concept_ids(cooccurring_with)
+            where += (f" AND mentions.pmid IN "
+                      f"(SELECT pmid FROM mentions WHERE concept_id IN ({_placeholders(second)}))")
+            parameters += second
+
+        if not by_year:
+            rows = self.query(f"SELECT lower(mention) AS text, COUNT(*) AS count FROM mentions WHERE {where} "
+                              f"GROUP BY text ORDER BY count DESC, text LIMIT ?", parameters + (n,))
+            return [{'mention': text, 'count': count} for text, count in rows]
+
+        rows = self.query(f"SELECT articles.year, lower(mention) AS text, COUNT(*) AS count FROM mentions "
+                          f"LEFT JOIN articles USING (pmid) WHERE {where} "
+                          f"GROUP BY articles.year, text ORDER BY articles.year, count DESC, text", parameters)
+        by_year = defaultdict(list)
+        for year, text, count in rows:
+            year_mentions = by_year[str(year) if year else 'unknown']
+            if len(year_mentions) < n:
+                year_mentions.append({'mention': text, 'count': count})
+        return dict(by_year)
+
+    def articles_by_year(self, concepts):
+        """Number of articles mentioning any of ``concepts`` per publication year."""
+        first = concept_ids(concepts)
+        rows = self.query(f"SELECT articles.year, COUNT(*) FROM "
+                          f"(SELECT DISTINCT pmid FROM mentions WHERE concept_id IN ({_placeholders(first)})) "
+                          f"AS matches LEFT JOIN articles USING (pmid) GROUP BY articles.year "
+                          f"ORDER BY articles.year", first)
+        return {str(year) if year else 'unknown': count for year, count in rows}
+
+
+def print_result(result, as_json):
+    if as_json:
+        print(json.dumps(result, indent=2))
+    elif isinstance(result, dict):
+        for key, value in result.items():
+            print(f"{key}: {value}")
+    else:
+        for row in result:
+            print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Query the olfactory/neurodegenerative knowledge base.",
+        epilog="Example: python association_queries.py top-mentions smell_disorder --with parkinson --by-year")
+    parser.add_argument("--database", default=DEFAULT_DATABASE_PATH,
+                        help=f"database built by knowledge_base.py (default: {DEFAULT_DATABASE_PATH})")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    concepts_help = f"comma-separated concept IDs or group names ({', '.join(CONCEPT_GROUPS)})"
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cooccur = commands.add_parser("cooccur", help="articles mentioning both concept groups")
+    cooccur.add_argument("concepts", help=concepts_help)
+    cooccur.add_argument("other_concepts", help=concepts_help)
+    cooccur.add_argument("--by-year", action="store_true", help="count articles per publication year")
+
+    relations = commands.add_parser("relations", help="relations involving a concept group")
+    relations.add_argument("concepts", help=concepts_help)
+    relations.add_argument("other_concepts", nargs="?", help="only relations with these concepts on the other side")
+    relations.add_argument("--type", dest="relation_type", help="e.g. Association, Positive_Correlation")
+
+    top_mentions = commands.add_parser("top-mentions", help="most frequent mention texts of a concept group")
+    top_mentions.add_argument("concepts", help=concepts_help)
+    top_mentions.add_argument("-n", type=int, default=10, help="number of mentions (default: 10)")
+    top_mentions.add_argument("--with", dest="cooccurring_with",
+                              help="only count articles that also mention these concepts")
+    top_mentions.add_argument("--by-year", action="store_true", help="top mentions per publication year")
+
+    years = commands.add_parser("years", help="articles mentioning a concept group per publication year")
+    years.add_argument("concepts", help=concepts_help)
+    args = parser.parse_args()
+
+    queries = AssociationQueries(args.database)
+    if args.command == "cooccur":
+        result = queries.co_occurrence(args.concepts, args.other_concepts, by_year=args.by_year)
+    elif args.command == "relations":
+        result = queries.relations(args.concepts, args.other_concepts, relation_type=args.relation_type)
+    elif args.command == "top-mentions":
+        result = queries.top_mentions(args.concepts, n=args.n, cooccurring_with=args.cooccurring_with,
+                                      by_year=args.by_year)
+    else:
+        result = queries.articles_by_year(args.concepts)
+    print_result(result, args.json)
+    queries.close()
@@ -0,0 +1,138 @@
+import heapq
+import json
+import math
+import random
+import time
+from collections import deque
+
+# HTTP statuses worth retrying as-is; any other error means the batch itself is bad
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class AdaptiveBatchScheduler:
+    """Hands out PMID batches whose size follows the observed server behaviour.
+
+    Successful, fast, small responses grow the batch size; slow or large
+    responses and a rising error rate shrink it.  Transient failures are
+    requeued with jittered exponential backoff, and a batch that keeps failing
+    (or is rejected outright) is split in half until the bad PMIDs are isolated.
+    Whatever could not be fetched ends up in ``report()``.
+    """
+
+    def __init__(self, pmids, initial_batch_size=100, min_batch_size=1, max_batch_size=100,
+                 target_latency=10.0, max_payload_bytes=5_000_000, max_error_rate=0.2,
+                 max_retries=3, base_backoff=2.0, max_backoff=60.0):
+        self.pending = deque(dict.fromkeys(pmids))  # Drop duplicate PMIDs, keep order
+        self.total = len(self.pending)
+        self.batch_size = initial_batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.max_error_rate = max_error_rate
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        # Exponentially weighted share of recent requests that failed
+        self.error_rate = 0.0
+        self.retry_heap = []  # (ready_at, sequence, batch, attempts)
+        self.attempts = {}
+        self.in_flight = 0
+        self.sequence = 0
+
+        self.fetched = 0
+        self.not_returned = []
+        self.failed = {}
+        self.retries = 0
+        self.splits = 0
+
+    def finished(self):
+        return not self.pending and not self.retry_heap and self.in_flight == 0
+
+    def next_batch(self):
+        """Return ``(batch, wait_seconds)``, or None when nothing is ready to send.
+
+        None with ``finished()`` still False means batches are in flight and may
+        yet be requeued.
+        """
+        now = time.monotonic()
+        if self.retry_heap and (self.retry_heap[0][0] <= now or not self.pending):
+            ready_at, _, batch, attempts = heapq.heappop(self.retry_heap)
+            wait = max(0.0, ready_at - now)
+        elif self.pending:
+            size = min(self.batch_size, len(self.pending))
+            batch = tuple(self.pending.popleft() for _ in range(size))
+            attempts = 0
+            wait = 0.0
+        else:
+            return None
+        self.attempts[batch] = attempts
+        self.in_flight += 1
+        return batch, wait
+
+    def _observe(self, failed):
+        self.error_rate = 0.8 * self.error_rate + 0.2 * (1.0 if failed else 0.0)
+
+    def _shrink(self):
+        self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+
+    def _grow(self):
+        self.batch_size = min(self.max_batch_size, math.ceil(self.batch_size * 1.25))
+
+    def record_success(self, batch, latency, payload_bytes, not_returned=()):
+        self.in_flight -= 1
+        self.attempts.pop(batch, None)
+        self._observe(False)
+        self.fetched += len(batch) - len(not_returned)
+        self.not_returned.extend(not_returned)
+
+        if (latency > self.target_latency or payload_bytes > self.max_payload_bytes
+                or self.error_rate > self.max_error_rate):
+            self._shrink()
+        elif latency < self.target_latency / 2 and payload_bytes < self.max_payload_bytes / 2:
+            self._grow()
+
+    def record_failure(self, batch, error, status=None):
+        """Requeue, split or give up on a batch whose request failed.
+
+        ``status`` is the HTTP status for error responses and None for
+        exceptions such as timeouts, which are always treated as transient.
+        """
+        self.in_flight -= 1
+        attempts = self.attempts.pop(batch, 0) + 1
+        self._observe(True)
+        self._shrink()
+
+        transient = status is None or status in TRANSIENT_STATUSES
+        if transient and attempts <= self.max_retries:
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempts))
+            self._requeue(batch, attempts, delay)
+            self.retries += 1
+        elif len(batch) > 1:
+            middle = len(batch) // 2
+            self._requeue(batch[:middle], 0, 0.0)
+            self._requeue(batch[middle:], 0, 0.0)
+            self.splits += 1
+        else:
+            self.failed[batch[0]] = error
+
+    def _requeue(self, batch, attempts, delay):
+        self.sequence += 1
+        heapq.heappush(self.retry_heap, (time.monotonic() + delay, self.sequence, batch, attempts))
+
+    def report(self):
+        return {
+            'requested': self.total,
+            'fetched': self.fetched,
+            'not_returned': self.not_returned,
+            'failed': self.failed,
+            'retries': self.retries,
+            'splits': self.splits,
+            'final_batch_size': self.batch_size,
+        }
+
+    def write_report(self, report_path):
+        with open(report_path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.report(), report_file, indent=2)
@@ -0,0 +1,90 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+
+# Seconds a script may take to import (its own module code, not the interpreter start)
+DEFAULT_BUDGET = 0.5
+DEFAULT_RUNS = 3
+
+# Loads a script by path without running its main(); file names such as
+# data-visualization.py are not valid module names, so plain import cannot be used
+LOAD_SCRIPT = """
+import importlib.util, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("startup_benchmark_target", sys.argv[1])
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(time.perf_counter() - start)
+"""
+
+
+def repo_scripts():
+    here = os.path.dirname(os.path.abspath(__file__))
+    return sorted(path for path in glob.glob(os.path.join(here, '*.py'))
+                  if os.path.basename(path) != os.path.basename(__file__))
+
+
+def import_time(script_path, runs=DEFAULT_RUNS):
+    """Best of ``runs`` fresh-interpreter import times of ``script_path``, in seconds."""
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', LOAD_SCRIPT, script_path], capture_output=True, text=True,
+                                cwd=os.path.dirname(script_path))
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+def slowest_imports(script_path, count=5):
+    """The modules with the largest cumulative import time, from ``python -X importtime``."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', LOAD_SCRIPT, script_path],
+                            capture_output=True, text=True, cwd=os.path.dirname(script_path))
+    imports = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if line.startswith('import time:') and len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2]))
+    # Only top-level imports (indented by a single space): nested ones are
+    # already part of their parent's cumulative time
+    top_level = [(cumulative, name.strip()) for cumulative, name in imports if not name.startswith('  ')]
+    return sorted(top_level, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail when importing any script of the repository takes longer than the budget.")
+    parser.add_argument("scripts", nargs="*", help="scripts to check (default: every *.py next to this file)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"maximum import time in seconds (default: {DEFAULT_BUDGET})")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"imports per script; the fastest counts (default: {DEFAULT_RUNS})")
+    args = parser.parse_args()
+
+    failures = 0
+    for script_path in [os.path.abspath(path) for path in args.scripts] or repo_scripts():
+        name = os.path.basename(script_path)
+        try:
+            seconds = import_time(script_path, args.runs)
+        except RuntimeError as e:
+            print(f"ERROR {name}: {e}")
+            failures += 1
+            continue
+
+        if seconds <= args.budget:
+            print(f"ok    {name}: {seconds * 1000:.0f} ms")
+        else:
+            print(f"SLOW  {name}: {seconds * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+            for cumulative, module in slowest_imports(script_path):
+                print(f"\t{cumulative / 1000:.0f} ms\t{module}")
+            failures += 1
+
+    if failures:
+        print(f"{failures} script(s) failed the startup budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
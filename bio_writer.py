@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+import os
+
+
+def pmid_fraction(pmid):
+    """Deterministic pseudo-random number in [0, 1) derived from a PMID.
+
+    Unlike ``hash()`` it is the same in every process and on every run, so a
+    document always lands in the same split or fold.
+    """
+    digest = hashlib.sha1(str(pmid).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def is_test_document(pmid, test_size):
+    """True when the document with ``pmid`` belongs to the test split (about ``test_size`` of all documents)."""
+    return pmid_fraction(pmid) < test_size
+
+
+def document_fold(pmid, folds):
+    """Fold (0 .. folds - 1) of the document with ``pmid``; fold 0 is the test split of ``test_size=1/folds``."""
+    return int(pmid_fraction(pmid) * folds)
+
+
+def fold_path(path, fold):
+    """``entity_tags.txt`` -> ``entity_tags.fold0.txt``."""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.fold{fold}{extension}"
+
+
+class BIOFile:
+    """Writes tagged sentences in the word<TAB>tag format, one blank line after each sentence.
+
+    Documents are written as they arrive.  With ``shard_size`` a new file
+    (``train_tags.00000.txt``, ``train_tags.00001.txt``, ...) is started after
+    that many documents, and with ``compress`` the files are gzipped
+    (``.gz`` is appended to their names).  ``paths`` lists the files written.
+    """
+
+    def __init__(self, path, shard_size=None, compress=False):
+        self.path = path
+        self.shard_size = shard_size
+        self.compress = compress
+        self.paths = []
+        self.documents = 0
+        self.file = None
+
+    def _shard_path(self):
+        path = self.path
+        if self.shard_size:
+            stem, extension = os.path.splitext(path)
+            path = f"{stem}.{len(self.paths):05d}{extension}"
+        return path + '.gz' if self.compress and not path.endswith('.gz') else path
+
+    def _open_next(self):
+        self.close()
+        path = self._shard_path()
+        if path.endswith('.gz'):
+            self.file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+        self.paths.append(path)
+
+    def write_document(self, sentences):
+        """Write the ``[(word, tag), ...]`` sentences of one document."""
+        if self.file is None or (self.shard_size and self.documents % self.shard_size == 0):
+            self._open_next()
+        self.file.write(''.join(''.join(f"{word}\t{tag}\n" for word, tag in tags) + "\n" for tags in sentences))
+        self.documents += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # An empty split still gets its (empty) file, as before
+        if not self.paths:
+            self._open_next()
+        self.close()
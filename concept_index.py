@@ -0,0 +1,88 @@
+import json
+import sys
+from array import array
+from functools import reduce
+
+import numpy as np
+
+from pubtator_documents import iter_documents
+
+
+def build_concept_index(file_path, index_path):
+    """Build a concept ID -> sorted PMID postings index from a corpus file.
+
+    Each postings list is delta-encoded and the whole index is saved with
+    ``np.savez_compressed``, so it stays small and loads in one read.
+    """
+    postings = {}
+    for document in iter_documents(file_path):
+        pmid = int(document.pmid)
+        for concept_id in {entity.concept_id for entity in document.entities if entity.concept_id}:
+            postings.setdefault(concept_id, array('q')).append(pmid)
+
+    concepts = sorted(postings)
+    # A PMID listed twice in the corpus must only appear once in its postings
+    sorted_postings = [np.unique(np.frombuffer(postings.pop(concept_id), dtype=np.int64))
+                       for concept_id in concepts]
+    offsets = np.zeros(len(concepts) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(pmids) for pmids in sorted_postings])
+
+    deltas = np.empty(offsets[-1], dtype=np.int64)
+    for i, pmids in enumerate(sorted_postings):
+        # First PMID absolute, then gaps: small numbers that compress well
+        deltas[offsets[i]:offsets[i + 1]] = np.diff(pmids, prepend=0)
+
+    np.savez_compressed(index_path, concepts=np.array(json.dumps(concepts)), offsets=offsets,
+                        deltas=deltas)
+    return ConceptIndex(index_path)
+
+
+class ConceptIndex:
+    """Loaded postings index answering concept co-occurrence queries without the corpus."""
+
+    def __init__(self, index_path):
+        with np.load(index_path) as index:
+            concepts = json.loads(str(index['concepts']))
+            self.offsets = index['offsets']
+            self.deltas = index['deltas']
+        self.positions = {concept_id: i for i, concept_id in enumerate(concepts)}
+
+    def __contains__(self, concept_id):
+        return concept_id in self.positions
+
+    def postings(self, concept_id):
+        """Sorted PMIDs of the articles mentioning ``concept_id``."""
+        i = self.positions.get(concept_id)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return np.cumsum(self.deltas[self.offsets[i]:self.offsets[i + 1]])
+
+    def any_of(self, concept_ids):
+        """PMIDs mentioning at least one of ``concept_ids``."""
+        return reduce(np.union1d, (self.postings(concept_id) for concept_id in concept_ids),
+                      np.empty(0, dtype=np.int64))
+
+    def all_of(self, *concept_groups):
+        """PMIDs mentioning a concept from every group, e.g. all_of({'MESH:D010300'}, {'MESH:D000857'})."""
+        if not concept_groups:
+            raise ValueError("all_of() needs at least one group of concept IDs")
+        groups = [self.any_of(group) for group in concept_groups]
+        groups.sort(key=len)  # Intersect the shortest lists first
+        return reduce(lambda left, right: np.intersect1d(left, right, assume_unique=True), groups)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == 'build':
+        build_concept_index(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'query':
+        index = ConceptIndex(sys.argv[2])
+        groups = [argument.split(',') for argument in sys.argv[3:]]
+        pmids = index.all_of(*groups)
+        print(f"{len(pmids)} articles")
+        print(','.join(str(pmid) for pmid in pmids))
+    else:
+        print("Usage: python concept_index.py build [input_file] [index_file.npz]")
+        print("       python concept_index.py query [index_file.npz] [concepts] [concepts] ...")
+        print("\tEach [concepts] argument is a comma-separated group; an article must mention")
+        print("\tat least one concept of every group.")
+        print("Example: python concept_index.py query index.npz MESH:D010300 MESH:D000857")
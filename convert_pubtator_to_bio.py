@@ -1,62 +1,93 @@
-import re
-from transformers import AutoTokenizer
-import numpy
+from itertools import islice
 
-# Load tokenizer
-tokenizer = AutoTokenizer.from_pretrained("bert-base-cased")
+import numpy as np
 
+from nlp_resources import get_tokenizer
+from pubtator_documents import iter_documents
+from sliding_windows import MAX_LENGTH, STRIDE, window_ranges
 
-# Helper function to split PubTator annotations and text
-def parse_pubtator_file(file_path):
-    with open(file_path, 'r') as f:
-        raw_data = f.read().strip().split('\n\n')
+TOKENIZER_NAME = "bert-base-cased"
+# Documents per fast-tokenizer call
+BATCH_SIZE = 1000
 
-    data = []
-    for block in raw_data:
-        lines = block.split('\n')
-        pmid, title_line = lines[0].split('|')[0], lines[0]
-        abstract_line = lines[1]
-        annotations = lines[2:]  # List of entity annotations
 
+# Helper function to collect the text and entity annotations of each article
+def parse_pubtator_file(file_path):
+    data = []
+    for document in iter_documents(file_path):
         # Collect the text (title + abstract)
-        title = title_line.split('|')[2]
-        abstract = abstract_line.split('|')[2]
-        full_text = title + " " + abstract
+        full_text = document.title + " " + document.abstract
 
         # Collect annotations in tuples: (start, end, entity_type)
-        entity_info = []
-        for annotation in annotations:
-            parts = annotation.split('\t')
-            entity_info.append((int(parts[1]), int(parts[2]), parts[4]))
+        entity_info = [(entity.start, entity.end, entity.type) for entity in document.entities]
 
         data.append((full_text, entity_info))
 
     return data
 
 
-# Function to convert PubTator data into tokenized BIO format
-def convert_to_bio_format(data):
-    bio_data = []
-
-    for text, entities in data:
-        # Tokenize the text
-        tokens = tokenizer.tokenize(text)
-        token_offsets = tokenizer(text, return_offsets_mapping=True)['offset_mapping']
-
-        # Initialize BIO labels
-        labels = ['O'] * len(tokens)
+# Assign BIO labels to one document's tokens from its entity annotations
+def assign_bio_labels(token_offsets, entities):
+    """Label the tokens that lie entirely inside an entity span: B- on the token at its start, I- after.
+
+    ``token_offsets`` is an (n, 2) array of character offsets in text order.
+    Since token starts and ends are both sorted, the tokens of an entity are
+    found with two binary searches, so labelling is linear in the number of
+    tokens plus entities instead of their product.  Where entities overlap
+    the one listed last wins.
+    """
+    labels = ['O'] * len(token_offsets)
+    if not entities or not len(token_offsets):
+        return labels
+
+    spans = np.array([(start, end) for start, end, _ in entities], dtype=np.int64)
+    # First token starting at or after the entity start, first token ending after the entity end
+    first_tokens = np.searchsorted(token_offsets[:, 0], spans[:, 0], side='left')
+    last_tokens = np.searchsorted(token_offsets[:, 1], spans[:, 1], side='right')
+    for (start, _, entity_type), first, last in zip(entities, first_tokens.tolist(), last_tokens.tolist()):
+        if first >= last:
+            continue
+        labels[first:last] = [f'I-{entity_type}'] * (last - first)
+        if token_offsets[first, 0] == start:
+            labels[first] = f'B-{entity_type}'
+    return labels
 
-        # Assign BIO labels based on entity annotations
-        for start, end, entity_type in entities:
-            for i, (token_start, token_end) in enumerate(token_offsets):
-                if token_start >= start and token_end <= end:
-                    if token_start == start:
-                        labels[i] = f'B-{entity_type}'
-                    else:
-                        labels[i] = f'I-{entity_type}'
 
-        # Combine tokenized words with their BIO labels
-        bio_data.append(list(zip(tokens, labels)))
+# Function to convert PubTator data into tokenized BIO format
+def convert_to_bio_format(data, batch_size=BATCH_SIZE, max_length=MAX_LENGTH, stride=STRIDE):
+    """Tokenize (text, entities) pairs ``batch_size`` documents at a time and label the tokens.
+
+    One call to the fast tokenizer per batch returns the tokens and their
+    character offsets together; special tokens are left out so the offsets
+    line up with the tokens that are written.  A document longer than
+    ``max_length`` model tokens (special tokens included) is written as
+    overlapping windows sharing ``stride`` tokens instead of being cut off
+    later; ``max_length=None`` keeps every document whole.
+    """
+    bio_data = []
+    tokenizer = get_tokenizer(TOKENIZER_NAME)  # Loaded on first use
+    window = max_length - tokenizer.num_special_tokens_to_add() if max_length else None
+
+    data = iter(data)
+    while True:
+        batch = list(islice(data, batch_size))
+        if not batch:
+            break
+        encodings = tokenizer([text for text, _ in batch], add_special_tokens=False, return_offsets_mapping=True)
+        for i, (_, entities) in enumerate(batch):
+            tokens = encodings.tokens(i)
+            token_offsets = np.array(encodings['offset_mapping'][i], dtype=np.int64).reshape(-1, 2)
+            labels = assign_bio_labels(token_offsets, entities)
+
+            # A document without text would only write an empty sequence
+            if not tokens:
+                continue
+            # Combine tokenized words with their BIO labels, one sequence per window
+            if window is None:
+                bio_data.append(list(zip(tokens, labels)))
+            else:
+                bio_data.extend(list(zip(tokens[start:end], labels[start:end]))
+                                for start, end in window_ranges(len(tokens), window, stride))
 
     return bio_data
 
@@ -70,16 +101,21 @@ def write_bio_file(bio_data, output_file):
             f.write("\n")  # Separate sentences by a blank line
 
 
-# File path to your PubTator data
-pubtator_file = 'neurodegenerative-disease/output_subset.txt'
+def main():
+    # File path to your PubTator data
+    pubtator_file = 'neurodegenerative-disease/output_subset.txt'
+
+    # Process PubTator data
+    data = parse_pubtator_file(pubtator_file)
+
+    # Convert data to BIO format
+    bio_data = convert_to_bio_format(data)
 
-# Process PubTator data
-data = parse_pubtator_file(pubtator_file)
+    # Save the BIO format data to a .txt file
+    write_bio_file(bio_data, 'neurodegenerative-disease/bio_format_output.txt')
 
-# Convert data to BIO format
-bio_data = convert_to_bio_format(data)
+    print("Data has been converted to BIO format and saved to 'bio_format_output.txt'.")
 
-# Save the BIO format data to a .txt file
-write_bio_file(bio_data, 'neurodegenerative-disease/bio_format_output.txt')
 
-print("Data has been converted to BIO format and saved to 'bio_format_output.txt'.")
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,10 @@
-import spacy
-from collections import defaultdict
+from collections import Counter, defaultdict
 
-# Load a SpaCy model
-nlp = spacy.load("en_core_web_sm")
-
-
-def parse_pubtator_file(file_path, output_file_path):
-    data = {}
-
-    # Read the contents of the file
-    with open(file_path, 'r', encoding='utf-8') as file:
-        pubtator_text = file.read()
-
-    # Split the input into articles for processing (separated by double newlines)
-    articles = pubtator_text.strip().split('\n\n')
+from parallel_counts import count_in_parallel
+from pubtator_documents import NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID, document_to_pubtator, iter_documents
 
+def count_documents(documents):
+    """Count one stream of articles; the result merges with ``parallel_counts.merge_counts``."""
     # Initialize counters and structures for the summary
     pmids = set()  # To store unique PMIDs
     neurodegenerative_pmids = set()  # To store unique PMIDs with neurodegenerative diseases
@@ -23,12 +13,8 @@ def parse_pubtator_file(file_path, output_file_path):
     relations = []  # To store relations between neurodegenerative diseases and smell disorders
 
     # This will hold the counts of relations by type
-    relation_counts = defaultdict(int)
+    relation_counts = Counter()
 
-    neurodegenerative_ids = {
-        'MESH:D000544', 'MESH:C537240', 'MESH:D003704', 'MESH:D019636', 'MESH:D010300'
-    }
-    smell_disorder_id = 'MESH:D000857'
 
     # Initialize counters for total entities
     total_neurodegenerative_entities = 0
@@ -37,100 +23,184 @@ def parse_pubtator_file(file_path, output_file_path):
     # Initialize a list to hold articles containing both entities
     both_entities_articles = []
 
-    # Iterate through the articles
-    for article in articles:
-        lines = article.strip().split('\n')  # Split the article into lines
-        current_abstract = None
-
-        for line in lines:
-            if '|a|' in line:  # Check for the abstract line
-                pmid, _, abstract = line.partition('|a|')
-                pmid = pmid.strip()
-                pmids.add(pmid)  # Add PMID to the set for unique count
-
-                # Set flags for current article
-                has_neurodegenerative = False
-                has_smell_disorder = False
-
-                # Check for entities in the subsequent lines
-                continue
-
-            # Handle annotations (tab or space-separated)
-            parts = line.split()  # Split by whitespace (space or tab)
-
-            # Check if this is an entity line
-            if len(parts) >= 6:  # Expecting at least 6 parts
-                entity_id = parts[5].strip()  # Get the entity ID from position 5
-                if entity_id in neurodegenerative_ids:
-                    total_neurodegenerative_entities += 1
-                    has_neurodegenerative = True
-                elif entity_id == smell_disorder_id:
-                    total_smell_disorder_entities += 1
-                    has_smell_disorder = True
-
-            # Handle relations between neurodegenerative diseases and smell disorders
-            elif len(parts) >= 4:  # Expecting at least PMID, relation type, entity, ...
-                pmid_relation = parts[0].strip()
-                relation_type = parts[1].strip()
-                entity_id = parts[2].strip()
-
-                if pmid_relation in pmids:  # Only consider if this PMID has been seen
-                    if entity_id in neurodegenerative_ids or entity_id == smell_disorder_id:
-                        relations.append((pmid_relation, relation_type, entity_id))
-                        relation_counts[relation_type] += 1  # Count relations by type
-
-        # After processing the lines, check the flags
+    for document in documents:
+        pmid = document.pmid
+        pmids.add(pmid)  # Add PMID to the set for unique count
+
+        # Set flags for current article
+        has_neurodegenerative = False
+        has_smell_disorder = False
+
+        for entity in document.entities:
+            if entity.concept_id in NEURODEGENERATIVE_IDS:
+                total_neurodegenerative_entities += 1
+                has_neurodegenerative = True
+            elif entity.concept_id == SMELL_DISORDER_ID:
+                total_smell_disorder_entities += 1
+                has_smell_disorder = True
+
+        # Handle relations between neurodegenerative diseases and smell disorders
+        for relation in document.relations:
+            if relation.concept_1 in NEURODEGENERATIVE_IDS or relation.concept_1 == SMELL_DISORDER_ID:
+                relations.append((pmid, relation.type, relation.concept_1))
+                relation_counts[relation.type] += 1  # Count relations by type
+
+        # After processing the annotations, check the flags
         if has_neurodegenerative:
             neurodegenerative_pmids.add(pmid)
         if has_smell_disorder:
             smell_disorder_pmids.add(pmid)
         if has_neurodegenerative and has_smell_disorder:
             both_pmids.add(pmid)
-            both_entities_articles.append(article)  # Add the entire article to the list
+            both_entities_articles.append(document_to_pubtator(document))  # Add the entire article to the list
+
+    return {
+        'pmids': pmids,
+        'neurodegenerative_pmids': neurodegenerative_pmids,
+        'smell_disorder_pmids': smell_disorder_pmids,
+        'both_pmids': both_pmids,
+        'relations': relations,
+        'relation_counts': relation_counts,
+        'total_neurodegenerative_entities': total_neurodegenerative_entities,
+        'total_smell_disorder_entities': total_smell_disorder_entities,
+        'both_entities_articles': both_entities_articles,
+    }
+
+
+def parse_pubtator_file(file_path, output_file_path, processes=1):
+    """Summarize ``file_path``; with ``processes`` > 1, shards are counted in a process pool."""
+    if processes == 1:
+        counts = count_documents(iter_documents(file_path))
+    else:
+        counts = count_in_parallel(file_path, count_documents, processes)
+
+    # Write each article containing both entities with double newline
+    with open(output_file_path, 'w', encoding='utf-8') as output_file:
+        for article in counts['both_entities_articles']:
+            output_file.write(article + '\n\n')
 
     # Prepare the final data summary
     summary = {
-        'Total Articles': len(pmids),
+        'Total Articles': len(counts['pmids']),
+        'Articles with Neurodegenerative Diseases': len(counts['neurodegenerative_pmids']),
+        'Articles with Smell Disorder': len(counts['smell_disorder_pmids']),
+        'Articles with Both Neurodegenerative and Smell Disorder': len(counts['both_pmids']),
+        'Relations between Neurodegenerative Diseases and Smell Disorders': len(counts['relations']),
+        'Total Neurodegenerative Entities': counts['total_neurodegenerative_entities'],
+        'Total Smell Disorder Entities': counts['total_smell_disorder_entities'],
+        'Relations Details': counts['relations'],  # Optional: show details if needed
+        'Relation Counts': counts['relation_counts'],  # Relation counts by type
+        'Both Entities Articles': counts['both_entities_articles']  # Store articles containing both entities
+    }
+
+    return summary
+
+
+def summarize_article(document):
+    """Flat counts one article contributes to the summary, for incremental runs."""
+
+    counts = defaultdict(int)
+    for entity in document.entities:
+        if entity.concept_id in NEURODEGENERATIVE_IDS:
+            counts['neurodegenerative_entities'] += 1
+        elif entity.concept_id == SMELL_DISORDER_ID:
+            counts['smell_disorder_entities'] += 1
+    for relation in document.relations:
+        if relation.concept_1 in NEURODEGENERATIVE_IDS or relation.concept_1 == SMELL_DISORDER_ID:
+            counts['relations'] += 1
+            counts[f'relation:{relation.type}'] += 1
+
+    # Per-article flags are stored as 0/1 counts
+    counts['articles_neurodegenerative'] = int(counts['neurodegenerative_entities'] > 0)
+    counts['articles_smell_disorder'] = int(counts['smell_disorder_entities'] > 0)
+    counts['articles_both'] = counts['articles_neurodegenerative'] * counts['articles_smell_disorder']
+    return counts
+
+
+def incremental_summary(file_path, state_path):
+    """Update the persisted counts with only the new, changed or removed articles."""
+    from incremental_counts import IncrementalAggregator
+
+    aggregator = IncrementalAggregator(state_path, summarize_article)
+    changed, removed = aggregator.update(file_path)
+    print(f"Folded in {changed} new or changed articles, removed {removed}")
+
+    totals = aggregator.totals
+    return {
+        'Total Articles': len(aggregator.pmids()),
+        'Articles with Neurodegenerative Diseases': totals['articles_neurodegenerative'],
+        'Articles with Smell Disorder': totals['articles_smell_disorder'],
+        'Articles with Both Neurodegenerative and Smell Disorder': totals['articles_both'],
+        'Relations between Neurodegenerative Diseases and Smell Disorders': totals['relations'],
+        'Total Neurodegenerative Entities': totals['neurodegenerative_entities'],
+        'Total Smell Disorder Entities': totals['smell_disorder_entities'],
+        'Relation Counts': {key[len('relation:'):]: count for key, count in totals.items()
+                            if key.startswith('relation:')},
+    }
+
+
+def count_from_store(store_dir):
+    """Compute the same counts from a columnar store with vectorized array operations.
+
+    Build the store once with ``python annotation_store.py SessionNumber.txt store``.
+    """
+    from annotation_store import AnnotationStore
+    import numpy as np
+
+    store = AnnotationStore(store_dir)
+
+    neurodegenerative_mask = store.entity_mask(NEURODEGENERATIVE_IDS)
+    smell_disorder_mask = store.entity_mask({SMELL_DISORDER_ID})
+    neurodegenerative_pmids = np.unique(store.entity_pmid[neurodegenerative_mask])
+    smell_disorder_pmids = np.unique(store.entity_pmid[smell_disorder_mask])
+    relation_mask = store.relation_mask({*NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID})
+
+    return {
+        'Total Articles': len(np.unique(store.document_pmid)),
         'Articles with Neurodegenerative Diseases': len(neurodegenerative_pmids),
         'Articles with Smell Disorder': len(smell_disorder_pmids),
-        'Articles with Both Neurodegenerative and Smell Disorder': len(both_pmids),
-        'Relations between Neurodegenerative Diseases and Smell Disorders': len(relations),
-        'Total Neurodegenerative Entities': total_neurodegenerative_entities,
-        'Total Smell Disorder Entities': total_smell_disorder_entities,
-        'Relations Details': relations,  # Optional: show details if needed
-        'Relation Counts': relation_counts,  # Relation counts by type
-        'Both Entities Articles': both_entities_articles  # Store articles containing both entities
+        'Articles with Both Neurodegenerative and Smell Disorder':
+            len(np.intersect1d(neurodegenerative_pmids, smell_disorder_pmids, assume_unique=True)),
+        'Relations between Neurodegenerative Diseases and Smell Disorders': int(relation_mask.sum()),
+        'Total Neurodegenerative Entities': int(neurodegenerative_mask.sum()),
+        'Total Smell Disorder Entities': int(smell_disorder_mask.sum()),
+        'Relation Counts': store.relation_counts(relation_mask),
     }
 
-    # Write the subset of articles containing both entities to the output file
-    with open(output_file_path, 'w', encoding='utf-8') as output_file:
-        for article in both_entities_articles:
-            output_file.write(article + '\n\n')  # Write each article with double newline
 
-    return summary
+def articles_with_both_from_index(index_path):
+    """PMIDs of articles with both a neurodegenerative disease and a smell disorder.
 
-# Example usage
-file_path = 'neurodegenerative-disease/SessionNumber.txt'  # Update with the actual file path
-output_file_path = 'neurodegenerative-disease/output_subset.txt'  # Update with the desired output file path
-summary_data = parse_pubtator_file(file_path, output_file_path)
+    Uses the postings index (``python concept_index.py build SessionNumber.txt index.npz``)
+    instead of scanning the corpus.
+    """
+    from concept_index import ConceptIndex
 
-# Print only the counts
-print(f"Total Articles: {summary_data['Total Articles']}")
-print(f"Articles with Neurodegenerative Diseases: {summary_data['Articles with Neurodegenerative Diseases']}")
-print(f"Articles with Smell Disorder: {summary_data['Articles with Smell Disorder']}")
-print(
-    f"Articles with Both Neurodegenerative and Smell Disorder: {summary_data['Articles with Both Neurodegenerative and Smell Disorder']}")
-print(
-    f"Relations between Neurodegenerative Diseases and Smell Disorders: {summary_data['Relations between Neurodegenerative Diseases and Smell Disorders']}")
-print(f"Total Neurodegenerative Entities: {summary_data['Total Neurodegenerative Entities']}")
-print(f"Total Smell Disorder Entities: {summary_data['Total Smell Disorder Entities']}")
+    return ConceptIndex(index_path).all_of(NEURODEGENERATIVE_IDS, {SMELL_DISORDER_ID})
 
-# Print relation counts by type
-print("\nRelation Counts by Type:")
-for relation_type, count in summary_data['Relation Counts'].items():
-    print(f"{relation_type}: {count}")
 
+def main():
+    # Example usage
+    file_path = 'neurodegenerative-disease/SessionNumber.txt'  # Update with the actual file path
+    output_file_path = 'neurodegenerative-disease/output_subset.txt'  # Update with the desired output file path
+    summary_data = parse_pubtator_file(file_path, output_file_path)  # Add processes=N to count shards in N processes
 
+    # Print only the counts
+    print(f"Total Articles: {summary_data['Total Articles']}")
+    print(f"Articles with Neurodegenerative Diseases: {summary_data['Articles with Neurodegenerative Diseases']}")
+    print(f"Articles with Smell Disorder: {summary_data['Articles with Smell Disorder']}")
+    print(
+        f"Articles with Both Neurodegenerative and Smell Disorder: {summary_data['Articles with Both Neurodegenerative and Smell Disorder']}")
+    print(
+        f"Relations between Neurodegenerative Diseases and Smell Disorders: {summary_data['Relations between Neurodegenerative Diseases and Smell Disorders']}")
+    print(f"Total Neurodegenerative Entities: {summary_data['Total Neurodegenerative Entities']}")
+    print(f"Total Smell Disorder Entities: {summary_data['Total Smell Disorder Entities']}")
 
+    # Print relation counts by type
+    print("\nRelation Counts by Type:")
+    for relation_type, count in summary_data['Relation Counts'].items():
+        print(f"{relation_type}: {count}")
 
 
+if __name__ == "__main__":
+    main()
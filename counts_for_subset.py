@@ -1,21 +1,48 @@
-import spacy
 import random
 from collections import defaultdict
+from functools import partial
 
-# Load a SpaCy model
-nlp = spacy.load("en_core_web_sm")
+from parallel_counts import count_in_parallel
+from pubtator_documents import NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID, document_to_pubtator, iter_documents
 
+def sample_documents(documents, sample_size):
+    """Uniformly sample ``sample_size`` documents from a stream (reservoir sampling)."""
+    sample = []
+    for i, document in enumerate(documents):
+        if i < sample_size:
+            sample.append(document)
+        else:
+            j = random.randint(0, i)
+            if j < sample_size:
+                sample[j] = document
+    return sample
 
-def parse_pubtator_file(file_path, output_file_path, sample_size=500):
-    data = {}
 
-    # Read the contents of the file
-    with open(file_path, 'r', encoding='utf-8') as file:
-        pubtator_text = file.read()
+def sample_shard(documents, sample_size=500):
+    """Reservoir-sample one shard and remember how many articles it held, for ``merge_samples``."""
+    seen = 0
 
-    # Split the input into articles for processing (separated by double newlines)
-    articles = pubtator_text.strip().split('\n\n')
+    def counted(documents):
+        nonlocal seen
+        for seen, document in enumerate(documents, 1):
+            yield document
 
+    sample = sample_documents(counted(documents), sample_size)
+    return {'seen': seen, 'size': sample_size, 'sample': sample}
+
+
+def merge_samples(left, right):
+    """Combine two shard samples into a uniform sample of both shards."""
+    seen = left['seen'] + right['seen']
+    take = min(left['size'], seen)
+    # How many of the combined sample come from the left shard follows the
+    # hypergeometric distribution; draw it by sampling positions in both shards
+    from_left = sum(1 for i in random.sample(range(seen), take) if i < left['seen'])
+    sample = random.sample(left['sample'], from_left) + random.sample(right['sample'], take - from_left)
+    return {'seen': seen, 'size': left['size'], 'sample': sample}
+
+
+def parse_pubtator_file(file_path, output_file_path, sample_size=500, processes=1):
     # Initialize counters and structures for the summary
     pmids = set()  # To store unique PMIDs
     neurodegenerative_pmids = set()
@@ -24,11 +51,6 @@ def parse_pubtator_file(file_path, output_file_path, sample_size=500):
     relations = []
     relation_counts = defaultdict(int)
 
-    # Define the MESH IDs for neurodegenerative and smell disorder terms
-    neurodegenerative_ids = {
-        'MESH:D000544', 'MESH:C537240', 'MESH:D003704', 'MESH:D019636', 'MESH:D010300'
-    }
-    smell_disorder_id = 'MESH:D000857'
     species_id = '9606'  # Species ID for humans
 
     # Initialize counters for totals
@@ -36,54 +58,42 @@ def parse_pubtator_file(file_path, output_file_path, sample_size=500):
     total_smell_disorder_entities = 0
     total_species_entities = 0  # New counter for Species 9606 as perceivers
 
-    # Randomly select a sample of articles
-    selected_articles = random.sample(articles, sample_size)
+    # Randomly select a sample of articles while streaming the file; with
+    # several processes each shard is sampled on its own and the samples merged
+    if processes == 1:
+        selected_articles = sample_documents(iter_documents(file_path), sample_size)
+    else:
+        selected_articles = count_in_parallel(file_path, partial(sample_shard, sample_size=sample_size),
+                                              processes, merge=merge_samples)['sample']
     selected_pmids = set()  # Track PMIDs of selected articles
     both_entities_articles = []
 
     # Iterate through the selected articles
-    for article in selected_articles:
-        lines = article.strip().split('\n')
-        current_pmid = None
+    for document in selected_articles:
+        current_pmid = document.pmid
+        pmids.add(current_pmid)
+        selected_pmids.add(current_pmid)
         has_neurodegenerative = False
         has_smell_disorder = False
         has_species = False
 
-        for line in lines:
-            # Process abstract and PMID
-            if '|a|' in line:
-                pmid, _, abstract = line.partition('|a|')
-                pmid = pmid.strip()
-                pmids.add(pmid)
-                selected_pmids.add(pmid)
-                current_pmid = pmid
-                continue
-
-            # Process each entity or relation in the article
-            parts = line.split()
-            if len(parts) >= 6:
-                entity_id = parts[5].strip()
-
-                # Count neurodegenerative and smell disorder terms by MESH ID
-                if entity_id in neurodegenerative_ids:
-                    total_neurodegenerative_entities += 1
-                    has_neurodegenerative = True
-                elif entity_id == smell_disorder_id:
-                    total_smell_disorder_entities += 1
-                    has_smell_disorder = True
-                elif entity_id == species_id:  # Count Species 9606 as perceivers
-                    total_species_entities += 1
-                    has_species = True
-
-            # Track relations if related to selected IDs
-            elif len(parts) >= 4:
-                pmid_relation = parts[0].strip()
-                relation_type = parts[1].strip()
-                entity_id = parts[2].strip()
-                if pmid_relation in selected_pmids:
-                    if entity_id in neurodegenerative_ids or entity_id == smell_disorder_id:
-                        relations.append((pmid_relation, relation_type, entity_id))
-                        relation_counts[relation_type] += 1
+        for entity in document.entities:
+            # Count neurodegenerative and smell disorder terms by MESH ID
+            if entity.concept_id in NEURODEGENERATIVE_IDS:
+                total_neurodegenerative_entities += 1
+                has_neurodegenerative = True
+            elif entity.concept_id == SMELL_DISORDER_ID:
+                total_smell_disorder_entities += 1
+                has_smell_disorder = True
+            elif entity.concept_id == species_id:  # Count Species 9606 as perceivers
+                total_species_entities += 1
+                has_species = True
+
+        # Track relations if related to selected IDs
+        for relation in document.relations:
+            if relation.concept_1 in NEURODEGENERATIVE_IDS or relation.concept_1 == SMELL_DISORDER_ID:
+                relations.append((current_pmid, relation.type, relation.concept_1))
+                relation_counts[relation.type] += 1
 
         # Track articles containing each type of entity
         if has_neurodegenerative:
@@ -92,7 +102,7 @@ def parse_pubtator_file(file_path, output_file_path, sample_size=500):
             smell_disorder_pmids.add(current_pmid)
         if has_neurodegenerative and has_smell_disorder:
             both_pmids.add(current_pmid)
-            both_entities_articles.append(article)
+            both_entities_articles.append(document_to_pubtator(document))
 
     # Prepare the final data summary
     summary = {
@@ -117,24 +127,29 @@ def parse_pubtator_file(file_path, output_file_path, sample_size=500):
     return summary
 
 
-# Example usage
-file_path = 'SessionNumber.txt'
-output_file_path = 'output_subset_500.txt'
-summary_data = parse_pubtator_file(file_path, output_file_path)
-
-# Print only the counts
-print(f"Total Articles: {summary_data['Total Articles']}")
-print(f"Articles with Neurodegenerative Diseases: {summary_data['Articles with Neurodegenerative Diseases']}")
-print(f"Articles with Smell Disorder: {summary_data['Articles with Smell Disorder']}")
-print(
-    f"Articles with Both Neurodegenerative and Smell Disorder: {summary_data['Articles with Both Neurodegenerative and Smell Disorder']}")
-print(
-    f"Relations between Neurodegenerative Diseases and Smell Disorders: {summary_data['Relations between Neurodegenerative Diseases and Smell Disorders']}")
-print(f"Total Neurodegenerative Entities: {summary_data['Total Neurodegenerative Entities']}")
-print(f"Total Smell Disorder Entities: {summary_data['Total Smell Disorder Entities']}")
-print(f"Total Perceiver Entities (Species 9606): {summary_data['Total Perceiver Entities (Species 9606)']}")
-
-# Print relation counts by type
-print("\nRelation Counts by Type:")
-for relation_type, count in summary_data['Relation Counts'].items():
-    print(f"{relation_type}: {count}")
+def main():
+    # Example usage
+    file_path = 'SessionNumber.txt'
+    output_file_path = 'output_subset_500.txt'
+    summary_data = parse_pubtator_file(file_path, output_file_path)  # Add processes=N to count shards in N processes
+
+    # Print only the counts
+    print(f"Total Articles: {summary_data['Total Articles']}")
+    print(f"Articles with Neurodegenerative Diseases: {summary_data['Articles with Neurodegenerative Diseases']}")
+    print(f"Articles with Smell Disorder: {summary_data['Articles with Smell Disorder']}")
+    print(
+        f"Articles with Both Neurodegenerative and Smell Disorder: {summary_data['Articles with Both Neurodegenerative and Smell Disorder']}")
+    print(
+        f"Relations between Neurodegenerative Diseases and Smell Disorders: {summary_data['Relations between Neurodegenerative Diseases and Smell Disorders']}")
+    print(f"Total Neurodegenerative Entities: {summary_data['Total Neurodegenerative Entities']}")
+    print(f"Total Smell Disorder Entities: {summary_data['Total Smell Disorder Entities']}")
+    print(f"Total Perceiver Entities (Species 9606): {summary_data['Total Perceiver Entities (Species 9606)']}")
+
+    # Print relation counts by type
+    print("\nRelation Counts by Type:")
+    for relation_type, count in summary_data['Relation Counts'].items():
+        print(f"{relation_type}: {count}")
+
+
+if __name__ == "__main__":
+    main()
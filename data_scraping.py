@@ -1,21 +1,156 @@
 import requests
+import urllib3
+import os
+import sqlite3
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+
+# E-utilities accept a few hundred IDs per POST; one request covers a whole batch
+BATCH_SIZE = 200
+# NCBI allows 3 requests per second without an API key and 10 with one
+API_KEY = os.environ.get("NCBI_API_KEY")
+REQUEST_INTERVAL = 0.1 if API_KEY else 0.34
+# Seconds to connect, and to wait for each chunk of the response; a stalled
+# connection then fails its batch instead of hanging the run
+REQUEST_TIMEOUT = (10, 60)
+
+DEFAULT_CACHE_PATH = 'pubmed_metadata.sqlite'
+
+
+def open_cache(cache_path=DEFAULT_CACHE_PATH):
+    connection = sqlite3.connect(cache_path)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS articles (
+            pmid TEXT PRIMARY KEY,
+            title TEXT,
+            abstract TEXT,
+            journal TEXT,
+            year TEXT,
+            found INTEGER NOT NULL
+        )
+    """)
+    return connection
+
+
+def cached_pmids(connection, pmids):
+    """Return the subset of ``pmids`` already in the cache."""
+    found = set()
+    pmids = list(pmids)
+    # Stay below SQLite's limit on bound parameters
+    for i in range(0, len(pmids), 500):
+        chunk = pmids[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        found.update(row[0] for row in connection.execute(
+            f"SELECT pmid FROM articles WHERE pmid IN ({placeholders})", chunk))
+    return found
+
+
+def element_text(element):
+    return ''.join(element.itertext()).strip() if element is not None else ''
+
+
+def parse_pubmed_article(article):
+    citation = article.find('MedlineCitation')
+    pmid = citation.findtext('PMID')
+    title = element_text(citation.find('Article/ArticleTitle'))
+
+    # Structured abstracts are split into labelled sections
+    sections = []
+    for abstract_text in citation.findall('Article/Abstract/AbstractText'):
+        text = element_text(abstract_text)
+        label = abstract_text.get('Label')
+        sections.append(f"{label}: {text}" if label else text)
+    abstract = ' '.join(sections)
+
+    journal = citation.findtext('Article/Journal/Title') or ''
+    year = (citation.findtext('Article/Journal/JournalIssue/PubDate/Year')
+            or (citation.findtext('Article/Journal/JournalIssue/PubDate/MedlineDate') or '')[:4])
+    return pmid, title, abstract, journal, year
+
+
+def iter_efetch_articles(stream):
+    """Yield parsed articles from an efetch XML stream, one element at a time."""
+    for _, element in ET.iterparse(stream, events=('end',)):
+        if element.tag == 'PubmedArticle':
+            yield parse_pubmed_article(element)
+            # Drop the finished article so memory stays flat on large batches
+            element.clear()
+
+
+def fetch_pubmed_batch(session, batch_pmids):
+    params = {'db': 'pubmed', 'retmode': 'xml', 'id': ','.join(batch_pmids)}
+    if API_KEY:
+        params['api_key'] = API_KEY
+    response = session.post(EFETCH_URL, data=params, stream=True, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return list(iter_efetch_articles(response.raw))
+
+
+def fetch_pubmed_records(pmids, cache_path=DEFAULT_CACHE_PATH):
+    """Fill the cache with title, abstract, journal and year for ``pmids``.
+
+    Only PMIDs missing from the cache are requested, ``BATCH_SIZE`` per call.
+    """
+    connection = open_cache(cache_path)
+    pmids = list(dict.fromkeys(pmids))
+    already_cached = cached_pmids(connection, pmids)
+    missing = [pmid for pmid in pmids if pmid not in already_cached]
+    print(f"{len(already_cached)} PMIDs cached, fetching {len(missing)}")
+
+    with requests.Session() as session:
+        for i in range(0, len(missing), BATCH_SIZE):
+            batch_pmids = missing[i:i + BATCH_SIZE]
+            try:
+                articles = fetch_pubmed_batch(session, batch_pmids)
+            # A stall while streaming the body surfaces as urllib3's ReadTimeoutError
+            except (requests.RequestException, urllib3.exceptions.HTTPError, ET.ParseError) as e:
+                print(f"Error fetching PMIDs {batch_pmids[0]}..{batch_pmids[-1]}: {e}")
+                continue
+
+            returned = {article[0] for article in articles}
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, 1)", articles)
+                # Remember PMIDs that PubMed does not return so they are not requested again
+                connection.executemany(
+                    "INSERT OR REPLACE INTO articles VALUES (?, NULL, NULL, NULL, NULL, 0)",
+                    [(pmid,) for pmid in batch_pmids if pmid not in returned])
+            time.sleep(REQUEST_INTERVAL)
+
+    return connection
+
 
 # Function to fetch title and abstract using PubMed eUtils API
-def fetch_pubmed_data(pmid):
-    url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi?db=pubmed&id={pmid}&retmode=json"
-    response = requests.get(url)
-    if response.status_code == 200:
-        summary_data = response.json()
-        title = summary_data['result'][str(pmid)]['title']
-        abstract = summary_data['result'][str(pmid)].get('abstract', 'No abstract available')
-        return title, abstract
-    else:
+def fetch_pubmed_data(pmid, cache_path=DEFAULT_CACHE_PATH):
+    connection = fetch_pubmed_records([str(pmid)], cache_path)
+    row = connection.execute(
+        "SELECT title, abstract FROM articles WHERE pmid = ? AND found = 1", (str(pmid),)).fetchone()
+    connection.close()
+    if row is None:
         return None, None
+    title, abstract = row
+    return title, abstract or 'No abstract available'
+
+
+if __name__ == "__main__":
+    pmid_file = sys.argv[1] if len(sys.argv) > 1 else 'pmid/pmid-TasteMeshO-set.txt'
+    cache_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CACHE_PATH
+
+    with open(pmid_file, 'r', encoding='utf-8') as input_file:
+        pmids = [line.strip() for line in input_file if line.strip()]
+
+    connection = fetch_pubmed_records(pmids, cache_path)
 
-# Loop through PMIDs and fetch title and abstract
-for pmid in pmids:
-    title, abstract = fetch_pubmed_data(pmid)
-    print(f"PMID: {pmid}")
-    print(f"Title: {title}")
-    print(f"Abstract: {abstract}")
-    print("\n")
+    # Loop through PMIDs and print title and abstract
+    for pmid in pmids:
+        row = connection.execute("SELECT title, abstract FROM articles WHERE pmid = ?", (pmid,)).fetchone()
+        title, abstract = row if row else (None, None)
+        print(f"PMID: {pmid}")
+        print(f"Title: {title}")
+        print(f"Abstract: {abstract or 'No abstract available'}")
+        print("\n")
+    connection.close()
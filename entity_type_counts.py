@@ -1,118 +1,174 @@
-import spacy
+import os
 from collections import defaultdict, Counter
+from functools import partial
 
-# Load a SpaCy model
-nlp = spacy.load("en_core_web_sm")
+from nlp_resources import get_nlp
+from parallel_counts import count_in_parallel
+from pubtator_documents import NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID, iter_documents
+from text_stats import abstract_stats
 
-def parse_pubtator_file(file_path):
-    data = {}
 
-    # Read the contents of the file
-    with open(file_path, 'r', encoding='utf-8') as file:
-        pubtator_text = file.read()
-
-    # Split the input into lines for processing
-    lines = pubtator_text.strip().split('\n')
+def count_documents(documents, count_text=True):
+    """Count one stream of articles; the result merges with ``parallel_counts.merge_counts``.
 
+    With ``count_text`` False the abstracts are not run through spaCy.
+    """
     # Initialize counters and structures for the summary
     pmids = set()  # To store unique PMIDs
     tokens_count = 0
     sentences_count = 0
     entities_count = 0
     relations_count = 0
-    entities_by_type = defaultdict(int)
-    relations_by_type = defaultdict(int)
+    entities_by_type = Counter()
+    relations_by_type = Counter()
 
     # Counters for specific IDs and tracking of smell words in articles with specific IDs
-    target_ids = {
-        'MESH:D000544': 0,
-        'MESH:C537240': 0,
-        'MESH:D003704': 0,
-        'MESH:D019636': 0,
-        'MESH:D010300': 0,
-        'MESH:D000857': 0
-    }
+    target_ids = Counter({concept_id: 0 for concept_id in (*NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID)})
     smell_entity_words = Counter()
-    neurodegenerative_smell_cooccurrence = defaultdict(lambda: defaultdict(Counter))
-
-    current_abstract = None
-    current_pmid = None
-    neuro_ids_in_article = set()  # Tracks neurodegenerative IDs in each article for co-occurrence
-
-    # Iterate through the lines to extract titles, abstracts, and annotations
-    for line in lines:
-        if '\t' not in line:  # Empty line or header
-            continue
-
-        # Handle abstracts
-        if '|a|' in line:
-            pmid, _, abstract = line.partition('|a|')
-            pmid = pmid.strip()
-            abstract = abstract.strip()
-            pmids.add(pmid)  # Add PMID to the set for unique count
-            current_pmid = pmid  # Track the current PMID for co-occurrences
-
-            # Process the abstract with SpaCy
-            doc = nlp(abstract)
+    neurodegenerative_smell_cooccurrence = defaultdict(Counter)
+
+    # Iterate through the articles to extract abstracts and annotations
+    for document in documents:
+        abstract = document.abstract.strip()
+        pmids.add(document.pmid)  # Add PMID to the set for unique count
+
+        # Process the abstract with SpaCy
+        if count_text:
+            doc = get_nlp()(abstract)
             tokens_count += len(doc)  # Count tokens
             sentences_count += len(list(doc.sents))  # Count sentences
 
-            current_abstract = abstract  # Store the current abstract for future use
-            neuro_ids_in_article.clear()  # Reset for each article
-            continue
-
-        # Handle annotations (tab-separated)
-        parts = line.split('\t')
+        neuro_ids_in_article = set()  # Tracks neurodegenerative IDs in each article for co-occurrence
 
-        if len(parts) >= 6:  # Entity lines with sufficient fields
-            entity_id = parts[5].strip()
-            entity_type = parts[4].strip()
+        for entity in document.entities:
+            entity_id = entity.concept_id
             entities_count += 1  # Increment total entity count
-            entities_by_type[entity_type] += 1  # Increment specific entity type count
+            entities_by_type[entity.type] += 1  # Increment specific entity type count
 
             # Increment counts for target IDs and track for co-occurrences
             if entity_id in target_ids:
                 target_ids[entity_id] += 1
 
                 # Track neurodegenerative disease IDs and smell disorder entities
-                if entity_id in {'MESH:D000544', 'MESH:C537240', 'MESH:D003704', 'MESH:D019636', 'MESH:D010300'}:
+                if entity_id in NEURODEGENERATIVE_IDS:
                     neuro_ids_in_article.add(entity_id)  # Track neurodegenerative disease ID in this article
 
                 # Track smell disorder entities and record co-occurrences
-                elif entity_id == 'MESH:D000857':
-                    smell_word = parts[3].strip().lower()  # Convert to lowercase
+                elif entity_id == SMELL_DISORDER_ID:
+                    smell_word = entity.text.strip().lower()  # Convert to lowercase
                     smell_entity_words[smell_word] += 1
 
                     # Check if any neurodegenerative IDs are in this article, indicating co-occurrence
                     for neuro_id in neuro_ids_in_article:
-                        neurodegenerative_smell_cooccurrence[neuro_id][smell_word][current_pmid] += 1
+                        neurodegenerative_smell_cooccurrence[neuro_id][smell_word] += 1
+
+        for relation in document.relations:
+            relations_count += 1
+            relations_by_type[relation.type] += 1
+
+    return {
+        'pmids': pmids,
+        'tokens_count': tokens_count,
+        'sentences_count': sentences_count,
+        'entities_count': entities_count,
+        'relations_count': relations_count,
+        'entities_by_type': entities_by_type,
+        'relations_by_type': relations_by_type,
+        'target_ids': target_ids,
+        'smell_entity_words': smell_entity_words,
+        # Neurodegenerative ID -> Counter of smell words in the same article
+        'cooccurrence': dict(neurodegenerative_smell_cooccurrence),
+    }
+
+
+def parse_pubtator_file(file_path, processes=1, stats_cache=None, stats_mode='parser'):
+    """Summarize ``file_path``; with ``processes`` > 1, shards are counted in a process pool.
+
+    With ``stats_cache``, tokens and sentences are counted separately by
+    ``text_stats`` (batched, pruned pipeline, per-PMID cache) instead of
+    running the full pipeline on every abstract.
+    """
+    count_shard = partial(count_documents, count_text=stats_cache is None)
+    if processes == 1:
+        counts = count_shard(iter_documents(file_path))
+    else:
+        counts = count_in_parallel(file_path, count_shard, processes)
+
+    if stats_cache is not None:
+        # processes=None means every CPU, which spaCy's n_process does not accept as None
+        stats = abstract_stats(iter_documents(file_path), stats_cache, stats_mode,
+                               n_process=processes or os.cpu_count())
+        counts['tokens_count'] = sum(tokens for tokens, _ in stats.values())
+        counts['sentences_count'] = sum(sentences for _, sentences in stats.values())
 
     # Sort smell entity words by frequency, most to least frequent
-    sorted_smell_entity_words = dict(smell_entity_words.most_common())
+    sorted_smell_entity_words = dict(counts['smell_entity_words'].most_common())
 
     # Prepare co-occurrence summary for readability
-    co_occurrence_summary = {
-        neuro_id: {smell_word: count for smell_word, pmids in words.items() for count in pmids.values()}
-        for neuro_id, words in neurodegenerative_smell_cooccurrence.items()
-    }
+    co_occurrence_summary = {neuro_id: dict(words) for neuro_id, words in counts['cooccurrence'].items()}
 
     # Prepare the final data summary
     summary = {
-        #'Total Articles': len(pmids),
-        #'Total Tokens': tokens_count,
-        #'Total Sentences': sentences_count,
-        #'Total Entities': entities_count,
-        #'Total Relations': relations_count,
-        #'Entities by Type': dict(entities_by_type),
-        #'Relations by Type': dict(relations_by_type),
-        #'Target ID Counts': dict(target_ids),
+        #'Total Articles': len(counts['pmids']),
+        #'Total Tokens': counts['tokens_count'],
+        #'Total Sentences': counts['sentences_count'],
+        #'Total Entities': counts['entities_count'],
+        #'Total Relations': counts['relations_count'],
+        #'Entities by Type': dict(counts['entities_by_type']),
+        #'Relations by Type': dict(counts['relations_by_type']),
+        #'Target ID Counts': dict(counts['target_ids']),
         #'Smell Disorder Entity Words': sorted_smell_entity_words,
         'Co-Occurrences': co_occurrence_summary
     }
 
     return summary
 
-# Example usage
-file_path = 'SessionNumber.txt'  # Update with the actual file path
-parsed_data = parse_pubtator_file(file_path)
-print(parsed_data)
+
+def summarize_article(document):
+    """Flat counts one article contributes to the summary, for incremental runs."""
+    counts = Counter()
+    neuro_ids_in_article = set()
+
+    for entity in document.entities:
+        counts[f'entity_type\t{entity.type}'] += 1
+        if entity.concept_id in NEURODEGENERATIVE_IDS:
+            counts[f'target_id\t{entity.concept_id}'] += 1
+            neuro_ids_in_article.add(entity.concept_id)
+        elif entity.concept_id == SMELL_DISORDER_ID:
+            counts[f'target_id\t{entity.concept_id}'] += 1
+            smell_word = entity.text.strip().lower()
+            counts[f'smell_word\t{smell_word}'] += 1
+            for neuro_id in neuro_ids_in_article:
+                counts[f'cooccurrence\t{neuro_id}\t{smell_word}'] += 1
+
+    for relation in document.relations:
+        counts[f'relation_type\t{relation.type}'] += 1
+    return counts
+
+
+def incremental_summary(file_path, state_path):
+    """Update the persisted counts with only the new, changed or removed articles."""
+    from incremental_counts import IncrementalAggregator
+
+    aggregator = IncrementalAggregator(state_path, summarize_article)
+    changed, removed = aggregator.update(file_path)
+    print(f"Folded in {changed} new or changed articles, removed {removed}")
+
+    co_occurrence_summary = defaultdict(dict)
+    for key, count in aggregator.totals.items():
+        if key.startswith('cooccurrence\t'):
+            _, neuro_id, smell_word = key.split('\t')
+            co_occurrence_summary[neuro_id][smell_word] = count
+
+    return {'Co-Occurrences': dict(co_occurrence_summary)}
+
+
+def main():
+    # Example usage
+    file_path = 'SessionNumber.txt'  # Update with the actual file path
+    parsed_data = parse_pubtator_file(file_path)  # Add processes=N to count shards in N processes
+    print(parsed_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+from collections import Counter
+
+from pubtator_documents import document_to_pubtator, parse_pubtator_lines
+
+STATE_VERSION = 1
+# Bytes read at a time while hashing the already-aggregated part of the input
+HASH_CHUNK = 1 << 20
+
+
+def _hash_prefix(file_path, length):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as input_file:
+        remaining = length
+        while remaining:
+            chunk = input_file.read(min(HASH_CHUNK, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _last_document_boundary(file_path):
+    """Byte offset just past the last blank line, where the last document starts.
+
+    The next run re-reads from here, so a document that was still being
+    appended when this run read the file is picked up whole.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as input_file:
+        position = size
+        while position > 0:
+            start = max(0, position - HASH_CHUNK)
+            input_file.seek(start)
+            # Overlap by one byte so a boundary straddling two chunks is found
+            chunk = input_file.read(position - start + 1)
+            boundary = chunk.rfind(b'\n\n')
+            if boundary != -1:
+                return start + boundary + 2
+            position = start
+    return 0
+
+
+def _document_digest(document):
+    return hashlib.sha1(document_to_pubtator(document).encode('utf-8')).hexdigest()
+
+
+class IncrementalAggregator:
+    """Keeps per-article contributions and corpus totals between runs.
+
+    ``summarize_document`` maps a ``Document`` to a flat {key: count} dict
+    (article flags are counts of 0 or 1).  The state file remembers each
+    article's digest and contribution plus a fingerprint of the input, so a
+    rerun only summarizes articles that are new or changed and subtracts the
+    ones that disappeared.  When the input only grew, just the appended part
+    of the file is parsed.
+    """
+
+    def __init__(self, state_path, summarize_document):
+        self.state_path = state_path
+        self.summarize_document = summarize_document
+        self.documents = {}  # pmid -> [digest, contribution]
+        self.totals = Counter()
+        self.input = {}
+        if os.path.exists(state_path):
+            with gzip.open(state_path, 'rt', encoding='utf-8') as state_file:
+                state = json.load(state_file)
+            if state.get('version') == STATE_VERSION:
+                self.documents = state['documents']
+                self.totals = Counter(state['totals'])
+                self.input = state['input']
+
+    def _fold(self, document):
+        digest = _document_digest(document)
+        previous = self.documents.get(document.pmid)
+        if previous is not None:
+            if previous[0] == digest:
+                return False
+            self.totals.subtract(previous[1])
+        contribution = {key: count for key, count in self.summarize_document(document).items() if count}
+        self.totals.update(contribution)
+        self.documents[document.pmid] = [digest, contribution]
+        return True
+
+    def _remove(self, pmid):
+        _, contribution = self.documents.pop(pmid)
+        self.totals.subtract(contribution)
+
+    def update(self, file_path):
+        """Fold the current contents of ``file_path`` into the totals.
+
+        Returns (articles added or changed, articles removed).
+        """
+        file_path = os.path.abspath(file_path)
+        size = os.path.getsize(file_path)
+        offset = self.input.get('offset', 0)
+        appended_only = (self.input.get('path') == file_path and size >= offset
+                         and _hash_prefix(file_path, offset) == self.input.get('prefix_sha256'))
+
+        changed = 0
+        seen = set()
+        with open(file_path, 'rb') as input_file:
+            if appended_only:
+                input_file.seek(offset)
+            lines = io.TextIOWrapper(input_file, encoding='utf-8')
+            for document in parse_pubtator_lines(lines):
+                seen.add(document.pmid)
+                changed += self._fold(document)
+
+        removed = 0
+        if not appended_only:
+            for pmid in [pmid for pmid in self.documents if pmid not in seen]:
+                self._remove(pmid)
+                removed += 1
+
+        boundary = _last_document_boundary(file_path)
+        self.input = {'path': file_path, 'offset': boundary, 'prefix_sha256': _hash_prefix(file_path, boundary)}
+        self.totals = Counter({key: count for key, count in self.totals.items() if count})
+        self.save()
+        return changed, removed
+
+    def save(self):
+        temp_path = self.state_path + '.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as state_file:
+            json.dump({'version': STATE_VERSION, 'input': self.input, 'totals': self.totals,
+                       'documents': self.documents}, state_file)
+        os.replace(temp_path, self.state_path)
+
+    def pmids(self):
+        return self.documents.keys()
@@ -0,0 +1,157 @@
+import csv
+import sqlite3
+import sys
+
+from pubtator_documents import iter_documents
+
+DEFAULT_DATABASE_PATH = 'knowledge_base.sqlite'
+DEFAULT_METADATA_PATH = 'csv-TasteMeshO-set.csv'
+
+# Documents inserted per transaction while loading
+INSERT_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE documents (
+    pmid INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    abstract TEXT NOT NULL
+);
+CREATE TABLE mentions (
+    pmid INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    mention TEXT NOT NULL,
+    type TEXT NOT NULL,
+    concept_id TEXT NOT NULL
+);
+CREATE TABLE relations (
+    pmid INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    concept_1 TEXT NOT NULL,
+    concept_2 TEXT NOT NULL
+);
+CREATE TABLE articles (
+    pmid INTEGER PRIMARY KEY,
+    title TEXT,
+    authors TEXT,
+    citation TEXT,
+    first_author TEXT,
+    journal TEXT,
+    year INTEGER,
+    create_date TEXT,
+    pmcid TEXT,
+    nihms_id TEXT,
+    doi TEXT
+);
+"""
+
+# Built after the bulk insert, which is much faster than maintaining them row by row.
+# Each index carries every column its queries read, so they are answered from
+# the index alone without touching the table.
+INDEXES = """
+CREATE INDEX mentions_by_concept ON mentions (concept_id, pmid, type, mention);
+CREATE INDEX mentions_by_pmid ON mentions (pmid, concept_id, type);
+CREATE INDEX relations_by_type ON relations (type, concept_1, concept_2, pmid);
+CREATE INDEX relations_by_concept ON relations (concept_1, concept_2, type, pmid);
+CREATE INDEX relations_by_pmid ON relations (pmid, type, concept_1, concept_2);
+CREATE INDEX articles_by_year ON articles (year, pmid);
+"""
+
+# CSV column -> articles column
+METADATA_COLUMNS = {
+    'PMID': 'pmid',
+    'Title': 'title',
+    'Authors': 'authors',
+    'Citation': 'citation',
+    'First Author': 'first_author',
+    'Journal/Book': 'journal',
+    'Publication Year': 'year',
+    'Create Date': 'create_date',
+    'PMCID': 'pmcid',
+    'NIHMS ID': 'nihms_id',
+    'DOI': 'doi',
+}
+
+
+def open_knowledge_base(database_path=DEFAULT_DATABASE_PATH):
+    connection = sqlite3.connect(database_path)
+    # WAL lets queries run while another process is loading
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _insert_documents(connection, batch):
+    with connection:
+        connection.executemany("INSERT INTO documents VALUES (?, ?, ?)",
+                               [(int(document.pmid), document.title, document.abstract) for document in batch])
+        connection.executemany("INSERT INTO mentions VALUES (?, ?, ?, ?, ?, ?)",
+                               [(int(document.pmid), entity.start, entity.end, entity.text, entity.type,
+                                 entity.concept_id)
+                                for document in batch for entity in document.entities])
+        connection.executemany("INSERT INTO relations VALUES (?, ?, ?, ?)",
+                               [(int(document.pmid), relation.type, relation.concept_1, relation.concept_2)
+                                for document in batch for relation in document.relations])
+
+
+def _metadata_rows(metadata_path):
+    # The PubMed export starts with a byte order mark
+    with open(metadata_path, 'r', encoding='utf-8-sig', newline='') as metadata_file:
+        for row in csv.DictReader(metadata_file):
+            values = {column: row.get(field) or None for field, column in METADATA_COLUMNS.items()}
+            values['pmid'] = int(values['pmid'])
+            values['year'] = int(values['year']) if values['year'] else None
+            yield tuple(values[column] for column in METADATA_COLUMNS.values())
+
+
+def load_knowledge_base(corpus_path, database_path=DEFAULT_DATABASE_PATH, metadata_path=DEFAULT_METADATA_PATH):
+    """(Re)build the SQLite knowledge base from a PubTator corpus and the PubMed CSV export.
+
+    Documents, entity mentions and relations are bulk-inserted in batches of
+    ``INSERT_BATCH`` articles; indexes are created once everything is loaded.
+    """
+    connection = open_knowledge_base(database_path)
+    with connection:
+        for table in ('documents', 'mentions', 'relations', 'articles'):
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.executescript(SCHEMA)
+
+    batch = []
+    loaded_pmids = set()
+    for document in iter_documents(corpus_path):
+        # An article fetched twice is only loaded once
+        if document.pmid in loaded_pmids:
+            continue
+        loaded_pmids.add(document.pmid)
+        batch.append(document)
+        if len(batch) >= INSERT_BATCH:
+            _insert_documents(connection, batch)
+            batch = []
+    if batch:
+        _insert_documents(connection, batch)
+
+    if metadata_path:
+        with connection:
+            connection.executemany(f"INSERT OR REPLACE INTO articles VALUES ({','.join('?' * len(METADATA_COLUMNS))})",
+                                   _metadata_rows(metadata_path))
+
+    connection.executescript(INDEXES)
+    # Give the query planner statistics for the new indexes
+    connection.execute("ANALYZE")
+    return connection
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python knowledge_base.py [input_file] [database_file] [metadata_csv]")
+        print("\t[input_file]: PubTator file (or JSON-lines records) to load")
+        print(f"\t[database_file]: SQLite database to (re)build, default {DEFAULT_DATABASE_PATH}")
+        print(f"\t[metadata_csv]: PubMed CSV export with article metadata, default {DEFAULT_METADATA_PATH}")
+    else:
+        database_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DATABASE_PATH
+        metadata_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_METADATA_PATH
+        connection = load_knowledge_base(sys.argv[1], database_path, metadata_path)
+        for table in ('documents', 'mentions', 'relations', 'articles'):
+            count, = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+            print(f"{table}: {count}")
+        connection.close()
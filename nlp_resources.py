@@ -0,0 +1,76 @@
+# Heavy NLP models and resources, loaded on first use and shared within a
+# process.  Importing a script stays cheap: spaCy, NLTK and transformers are
+# only imported (and their models loaded) when a function actually needs them.
+
+SPACY_MODEL = "en_core_web_sm"
+
+_nlp = None
+_punkt = None
+_tokenizers = {}
+
+
+def get_nlp():
+    """The full spaCy pipeline, loaded once per process."""
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load(SPACY_MODEL)
+    return _nlp
+
+
+def _punkt_resource():
+    """(NLTK resource name, PunktTokenizer class or None) for the installed NLTK."""
+    try:
+        # NLTK >= 3.8.2 ships the model as punkt_tab
+        from nltk.tokenize import PunktTokenizer
+    except ImportError:
+        PunktTokenizer = None
+    return ('punkt_tab' if PunktTokenizer else 'punkt'), PunktTokenizer
+
+
+def download_punkt():
+    """Download the NLTK Punkt model unless it is installed already.
+
+    Call it once in the parent before starting worker processes: workers
+    downloading it at the same time would write over each other's files.
+    """
+    import nltk
+    resource, _ = _punkt_resource()
+    try:
+        nltk.data.find(f'tokenizers/{resource}')
+    except LookupError:
+        nltk.download(resource)
+
+
+def get_punkt(download=True):
+    """The NLTK Punkt sentence tokenizer, loaded once per process.
+
+    The model is downloaded first when it is missing, unless ``download``
+    is False.
+    """
+    global _punkt
+    if _punkt is None:
+        import nltk
+        if download:
+            download_punkt()
+        _, PunktTokenizer = _punkt_resource()
+        _punkt = PunktTokenizer() if PunktTokenizer else nltk.data.load('tokenizers/punkt/english.pickle')
+    return _punkt
+
+
+def load_punkt():
+    """Pool initializer: load Punkt in a worker so it is ready before the first batch, never downloading it."""
+    get_punkt(download=False)
+
+
+def sent_tokenize(text):
+    """English sentence splitting, the same as ``nltk.sent_tokenize`` with a model kept in memory."""
+    return get_punkt().tokenize(text)
+
+
+def get_tokenizer(model_name="bert-base-cased"):
+    """A Hugging Face tokenizer, loaded once per process and model."""
+    if model_name not in _tokenizers:
+        from transformers import AutoTokenizer
+        _tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name)
+    return _tokenizers[model_name]
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+from array import array
+from collections import Counter, deque
+from functools import reduce
+from numbers import Number
+
+from pubtator_documents import document_from_json, parse_pubtator_lines
+
+# Shards per worker process: small enough to balance uneven articles, large
+# enough that per-shard overhead stays negligible
+SHARDS_PER_PROCESS = 4
+# Bytes read at a time while looking for the next article boundary
+SCAN_CHUNK = 1 << 16
+
+
+def _separator(file_path):
+    # Records are one per line in JSON-lines files and separated by a blank line in PubTator
+    return b'\n' if file_path.endswith('.jsonl') else b'\n\n'
+
+
+def _next_boundary(input_file, position, separator):
+    """Offset just past the first separator at or after ``position``, or None at EOF."""
+    input_file.seek(position)
+    carry = b''
+    while True:
+        chunk = input_file.read(SCAN_CHUNK)
+        if not chunk:
+            return None
+        data = carry + chunk
+        found = data.find(separator)
+        if found != -1:
+            return position - len(carry) + found + len(separator)
+        # Keep the tail so a separator split across two reads is still found
+        carry = data[-(len(separator) - 1):] if len(separator) > 1 else b''
+        position += len(chunk)
+
+
+def shard_ranges(file_path, shard_count):
+    """Split ``file_path`` into at most ``shard_count`` byte ranges that start at article boundaries."""
+    size = os.path.getsize(file_path)
+    separator = _separator(file_path)
+    starts = [0]
+    with open(file_path, 'rb') as input_file:
+        for i in range(1, shard_count):
+            boundary = _next_boundary(input_file, max(size * i // shard_count, starts[-1]), separator)
+            if boundary is None or boundary >= size:
+                break
+            if boundary > starts[-1]:
+                starts.append(boundary)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _iter_range_lines(file_path, start, end):
+    with open(file_path, 'rb') as input_file:
+        input_file.seek(start)
+        remaining = end - start
+        for line in input_file:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            yield line.decode('utf-8')
+
+
+def iter_range_documents(file_path, start, end):
+    """Stream the ``Document`` records stored between two article boundaries."""
+    lines = _iter_range_lines(file_path, start, end)
+    if file_path.endswith('.jsonl'):
+        return (document_from_json(line) for line in lines if line.strip())
+    return parse_pubtator_lines(lines)
+
+
+def merge_counts(left, right):
+    """Associatively merge two partial results of the same shape.
+
+    Sets are unioned, lists and arrays concatenated (shards are merged in
+    file order, so the result lists articles in the same order as a serial
+    run), numbers added and dicts/Counters merged key by key.
+    """
+    if isinstance(left, set):
+        return left | right
+    if isinstance(left, (list, array)):
+        return left + right
+    if isinstance(left, dict):
+        merged = Counter() if isinstance(left, Counter) else {}
+        merged.update(left)
+        for key, value in right.items():
+            merged[key] = merge_counts(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(left, Number):
+        return left + right
+    raise TypeError(f"Cannot merge values of type {type(left).__name__}")
+
+
+def _count_range(task):
+    count_documents, file_path, start, end = task
+    return count_documents(iter_range_documents(file_path, start, end))
+
+
+def process_pool(processes, initializer=None):
+    """A ``multiprocessing.Pool``, forked when the platform allows it.
+
+    Forked workers inherit already loaded models (e.g. spaCy) instead of reloading them.
+    """
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    return context.Pool(processes, initializer=initializer)
+
+
+def imap_ordered(pool, function, tasks, max_pending):
+    """Like ``pool.imap``, but with at most ``max_pending`` results submitted and not yet consumed.
+
+    ``pool.imap`` submits every task up front, so a slow consumer lets
+    results pile up in memory; here a new task is only submitted once the
+    oldest result has been taken.
+    """
+    pending = deque()
+    for task in tasks:
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(function, (task,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+def count_in_parallel(file_path, count_documents, processes=None, merge=merge_counts):
+    """Run ``count_documents`` over article-aligned shards of ``file_path`` in a process pool.
+
+    ``count_documents`` takes an iterable of ``Document`` records and returns a
+    partial result; the partials are combined in file order with ``merge``.
+    It must be picklable (a module-level function, or a ``functools.partial``
+    of one) so it can be sent to the workers.
+    """
+    processes = processes or os.cpu_count()
+    ranges = shard_ranges(file_path, processes * SHARDS_PER_PROCESS)
+    tasks = [(count_documents, file_path, start, end) for start, end in ranges]
+    if processes == 1 or len(tasks) <= 1:
+        return reduce(merge, map(_count_range, tasks))
+
+    with process_pool(processes) as pool:
+        return reduce(merge, pool.imap(_count_range, tasks))
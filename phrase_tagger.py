@@ -0,0 +1,98 @@
+import itertools
+import re
+
+# One piece of a term pattern: a character class or a literal character, optionally followed by ?
+PATTERN_PIECE = re.compile(r'\[([^\]]+)\](\?)?|\\?(.)(\?)?')
+WORD_SEPARATOR = re.compile(r'\\s[+*]?|\s+')
+# Key under which a trie node stores the label of the phrase ending there
+LABEL = None
+
+
+def word_variants(pattern):
+    """Expand a one-word pattern such as ``parkinson[s]?`` into every word it matches."""
+    choices = []
+    for piece in PATTERN_PIECE.finditer(pattern):
+        character_class, class_optional, literal, literal_optional = piece.groups()
+        if character_class is not None:
+            options = list(character_class)
+            optional = class_optional
+        else:
+            if literal in '.^$*+{}|()[]':
+                raise ValueError(f"Unsupported regular expression syntax in term: {pattern!r}")
+            options = [literal]
+            optional = literal_optional
+        choices.append(options + [''] if optional else options)
+    return [''.join(characters) for characters in itertools.product(*choices)]
+
+
+def term_phrases(term):
+    """Every word sequence matched by a ``\\bword\\s+word\\b`` term, as tuples of words."""
+    term = term.strip()
+    if term.startswith(r'\b'):
+        term = term[2:]
+    if term.endswith(r'\b'):
+        term = term[:-2]
+    words = [word_variants(word) for word in WORD_SEPARATOR.split(term) if word]
+    return list(itertools.product(*words))
+
+
+class PhraseTagger:
+    """Longest-match BIO tagger over a word trie built from term patterns.
+
+    ``entity_terms`` maps an entity label to its term patterns: phrases whose
+    words are separated by ``\\s+`` and may use optional characters such as
+    ``[s]?``.  Tagging walks the trie from each word, so a sentence is tagged
+    in one pass whatever the number of terms, and a multi-word match becomes
+    one B- tag followed by I- tags.  When the same phrase belongs to several
+    labels the first label in ``entity_terms`` wins.  ``normalize_word`` is
+    applied to every term word so terms are cleaned the same way as the text.
+    """
+
+    def __init__(self, entity_terms, normalize_word=None):
+        self.trie = {}
+        for label, terms in entity_terms.items():
+            for term in sorted(terms):
+                for phrase in term_phrases(term):
+                    if normalize_word is not None:
+                        phrase = tuple(filter(None, map(normalize_word, phrase)))
+                    if phrase:
+                        self.add(phrase, label)
+
+    def add(self, phrase, label):
+        node = self.trie
+        for word in phrase:
+            node = node.setdefault(word, {})
+        node.setdefault(LABEL, label)
+
+    def match(self, words, start):
+        """Return (end, label) of the longest phrase starting at ``words[start]``, or None."""
+        node = self.trie
+        longest = None
+        for end in range(start, len(words)):
+            node = node.get(words[end])
+            if node is None:
+                break
+            if LABEL in node:
+                longest = (end + 1, node[LABEL])
+        return longest
+
+    def tag(self, words, keys=None):
+        """Return [(word, tag)] with B-/I- tags for the phrases found in ``words``, O elsewhere.
+
+        ``keys`` are the words as looked up in the trie (e.g. lowercased),
+        defaulting to ``words`` themselves.
+        """
+        keys = words if keys is None else keys
+        tags = []
+        position = 0
+        while position < len(words):
+            found = self.match(keys, position)
+            if found is None:
+                tags.append((words[position], 'O'))
+                position += 1
+                continue
+            end, label = found
+            tags.append((words[position], f'B-{label}'))
+            tags.extend((word, f'I-{label}') for word in words[position + 1:end])
+            position = end
+        return tags
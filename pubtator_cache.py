@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import json
+import os
+
+from pubtator_documents import document_to_json
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+def split_documents(annotations):
+    """Split a PubTator export response into {pmid: document block}."""
+    documents = {}
+    for block in annotations.strip().split('\n\n'):
+        block = block.strip()
+        if not block:
+            continue
+        first_line = block.split('\n', 1)[0]
+        pmid = first_line.split('|', 1)[0].split('\t', 1)[0].strip()
+        if pmid:
+            documents[pmid] = block
+    return documents
+
+
+class PubTatorCache:
+    """Per-PMID on-disk cache of PubTator documents with a checkpoint manifest.
+
+    Every document is stored gzip-compressed under a path derived from the hash
+    of its PMID (``<cache_dir>/ab/<pmid>.txt.gz``).  Each stored batch is then
+    appended to ``manifest.jsonl`` together with the content digests, so an
+    interrupted download resumes from the last completed batch and a rerun with
+    an overlapping PMID list only fetches the PMIDs that are not cached yet.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.digests = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, 'r', encoding='utf-8') as manifest:
+            for line in manifest:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash while appending can leave a truncated last line
+                    continue
+                self.digests.update(entry.get('documents', {}))
+
+    def path_for(self, pmid):
+        bucket = hashlib.sha1(pmid.encode('utf-8')).hexdigest()[:2]
+        return os.path.join(self.cache_dir, bucket, f"{pmid}.txt.gz")
+
+    def __contains__(self, pmid):
+        return pmid in self.digests
+
+    def missing(self, pmids):
+        """Return the PMIDs, in order, that still have to be fetched."""
+        return [pmid for pmid in pmids if pmid not in self.digests]
+
+    def store_batch(self, batch_pmids, annotations):
+        """Cache every document of one export response and checkpoint it.
+
+        Returns the PMIDs of the batch that were absent from the response.
+        """
+        return self.store_documents(batch_pmids, split_documents(annotations))
+
+    def store_records(self, batch_pmids, documents):
+        """Cache parsed ``Document`` records, one JSON line per PMID."""
+        return self.store_documents(batch_pmids, {document.pmid: document_to_json(document)
+                                                  for document in documents})
+
+    def store_documents(self, batch_pmids, documents):
+        stored = {}
+        for pmid in batch_pmids:
+            block = documents.get(pmid)
+            if block is None:
+                continue
+            path = self.path_for(pmid)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + '.tmp'
+            with gzip.open(temp_path, 'wt', encoding='utf-8') as cache_file:
+                cache_file.write(block)
+            os.replace(temp_path, path)
+            stored[pmid] = hashlib.sha256(block.encode('utf-8')).hexdigest()
+
+        # Only record the batch once all of its documents are safely on disk
+        with open(self.manifest_path, 'a', encoding='utf-8') as manifest:
+            manifest.write(json.dumps({'documents': stored}) + '\n')
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        self.digests.update(stored)
+
+        return [pmid for pmid in batch_pmids if pmid not in stored]
+
+    def load(self, pmid):
+        with gzip.open(self.path_for(pmid), 'rt', encoding='utf-8') as cache_file:
+            return cache_file.read()
+
+    def assemble(self, pmids, output_path, batch_size=100):
+        """Write the combined PubTator file for ``pmids`` from the cache.
+
+        The output uses the same ``PMIDs:``/``Annotations:`` layout as the
+        fetcher, one section per ``batch_size`` PMIDs.  PMIDs that are not
+        cached are skipped; their number is returned.
+        """
+        cached = [pmid for pmid in pmids if pmid in self.digests]
+        temp_path = output_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as output_file:
+            for i in range(0, len(cached), batch_size):
+                batch_pmids = cached[i:i + batch_size]
+                output_file.write(f"PMIDs: {','.join(batch_pmids)}\n")
+                output_file.write("Annotations:\n")
+                output_file.write('\n\n'.join(self.load(pmid) for pmid in batch_pmids) + "\n\n\n\n")
+        os.replace(temp_path, output_path)
+        return len(pmids) - len(cached)
+
+    def assemble_records(self, pmids, output_path):
+        """Write a JSON-lines file of cached ``Document`` records for ``pmids``."""
+        cached = [pmid for pmid in pmids if pmid in self.digests]
+        temp_path = output_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as output_file:
+            for pmid in cached:
+                output_file.write(self.load(pmid) + '\n')
+        os.replace(temp_path, output_path)
+        return len(pmids) - len(cached)
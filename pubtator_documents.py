@@ -0,0 +1,242 @@
+import json
+from collections import namedtuple
+
+# Compact records shared by the fetcher and the analysis scripts.  Offsets are
+# character offsets into "title + ' ' + abstract", as in the PubTator format.
+Entity = namedtuple('Entity', ['start', 'end', 'text', 'type', 'concept_id'])
+Relation = namedtuple('Relation', ['type', 'concept_1', 'concept_2'])
+Document = namedtuple('Document', ['pmid', 'title', 'abstract', 'entities', 'relations'])
+
+# MeSH concepts the counting scripts look for: Alzheimer disease, Parkinson disease and other
+# neurodegenerative diseases, and olfaction disorders (the smell disorder)
+NEURODEGENERATIVE_IDS = ('MESH:D000544', 'MESH:C537240', 'MESH:D003704', 'MESH:D019636', 'MESH:D010300')
+SMELL_DISORDER_ID = 'MESH:D000857'
+
+# Where the documents sit inside the different BioC-JSON response layouts
+BIOC_WRAPPED_PREFIX = 'PubTator3.item'
+BIOC_ARRAY_PREFIX = 'item'
+BIOC_STREAM_PREFIX = ''
+
+
+def _read_head(read):
+    # Enough bytes to see past leading whitespace and the wrapper key, if any
+    head = read(64)
+    while head and len(head.lstrip()) < 16:
+        more = read(64)
+        if not more:
+            break
+        head += more
+    return head
+
+
+async def _aread_head(read):
+    head = await read(64)
+    while head and len(head.lstrip()) < 16:
+        more = await read(64)
+        if not more:
+            break
+        head += more
+    return head
+
+
+def _bioc_prefix(head):
+    head = head.lstrip()
+    if head.startswith(b'['):
+        return BIOC_ARRAY_PREFIX
+    if head.startswith(b'{') and head[1:].lstrip().startswith(b'"PubTator3"'):
+        return BIOC_WRAPPED_PREFIX
+    # One document object after another
+    return BIOC_STREAM_PREFIX
+
+
+class _PrefixedStream:
+    """File-like object that replays already-read bytes before the rest of a stream."""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def _take_head(self, size):
+        if size is None or size < 0:
+            chunk, self.head = self.head, b''
+        else:
+            chunk, self.head = self.head[:size], self.head[size:]
+        return chunk
+
+    def read(self, size=-1):
+        if self.head:
+            return self._take_head(size)
+        return self.stream.read(size)
+
+
+class _AsyncPrefixedStream(_PrefixedStream):
+
+    async def read(self, size=-1):
+        if self.head:
+            return self._take_head(size)
+        return await self.stream.read(size)
+
+
+def _role_identifier(role):
+    # PubTator3 stores {"identifier": ..., "type": ...}; older exports a plain string
+    if isinstance(role, dict):
+        return role.get('identifier') or ''
+    return role or ''
+
+
+def document_from_bioc(bioc_document):
+    """Convert one parsed BioC document into a ``Document`` record."""
+    title = ''
+    abstract = ''
+    entities = []
+    for passage in bioc_document.get('passages', []):
+        passage_type = (passage.get('infons') or {}).get('type', '')
+        if passage_type in ('title', 'front') and not title:
+            title = passage.get('text') or ''
+        elif passage_type == 'abstract':
+            abstract = passage.get('text') or ''
+
+        for annotation in passage.get('annotations', []):
+            infons = annotation.get('infons') or {}
+            for location in annotation.get('locations', []):
+                start = int(location['offset'])
+                entities.append(Entity(start, start + int(location['length']), annotation.get('text') or '',
+                                       infons.get('type') or '', infons.get('identifier') or ''))
+
+    relations = []
+    for relation in bioc_document.get('relations', []):
+        infons = relation.get('infons') or {}
+        relations.append(Relation(infons.get('type') or '', _role_identifier(infons.get('role1')),
+                                  _role_identifier(infons.get('role2'))))
+
+    entities.sort(key=lambda entity: (entity.start, entity.end))
+    return Document(str(bioc_document.get('id') or bioc_document.get('pmid') or ''), title, abstract,
+                    tuple(entities), tuple(relations))
+
+
+def iter_bioc_documents(stream):
+    """Yield ``Document`` records from a binary BioC-JSON stream as it is read.
+
+    Accepts the ``{"PubTator3": [...]}`` wrapper, a plain JSON array or
+    concatenated document objects.  Only one document is held in memory at a time.
+    """
+    import ijson
+
+    head = _read_head(stream.read)
+    prefix = _bioc_prefix(head)
+    for bioc_document in ijson.items(_PrefixedStream(head, stream), prefix,
+                                     multiple_values=prefix == BIOC_STREAM_PREFIX, use_float=True):
+        yield document_from_bioc(bioc_document)
+
+
+async def aiter_bioc_documents(stream):
+    """Async variant of ``iter_bioc_documents`` for aiohttp response streams."""
+    import ijson
+
+    head = await _aread_head(stream.read)
+    prefix = _bioc_prefix(head)
+    async for bioc_document in ijson.items_async(_AsyncPrefixedStream(head, stream), prefix,
+                                                 multiple_values=prefix == BIOC_STREAM_PREFIX,
+                                                 use_float=True):
+        yield document_from_bioc(bioc_document)
+
+
+def parse_pubtator_lines(lines):
+    """Yield one ``Document`` per article from PubTator text lines.
+
+    Title/abstract lines are ``PMID|t|text`` and ``PMID|a|text``; annotation
+    lines are tab-separated, so mentions may contain spaces.  Entity lines are
+    ``PMID, start, end, mention, type[, concept ID]`` and relation lines are
+    ``PMID, type, concept, concept``.  The ``PMIDs:``/``Annotations:`` lines the
+    fetcher writes between batches are skipped.
+    """
+    pmid = None
+    title = abstract = ''
+    entities = []
+    relations = []
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('PMIDs:') or line == 'Annotations:':
+            continue
+
+        bar = line.find('|')
+        if bar > 0 and line[bar:bar + 3] in ('|t|', '|a|') and '\t' not in line[:bar]:
+            line_pmid = line[:bar].strip()
+            if line_pmid != pmid or line[bar + 1] == 't':
+                if pmid is not None:
+                    yield Document(pmid, title, abstract, tuple(entities), tuple(relations))
+                pmid, title, abstract, entities, relations = line_pmid, '', '', [], []
+            if line[bar + 1] == 't':
+                title = line[bar + 3:]
+            else:
+                abstract = line[bar + 3:]
+            continue
+
+        fields = line.split('\t')
+        if len(fields) < 3:
+            continue
+        line_pmid = fields[0].strip()
+        if line_pmid != pmid:
+            # Annotations for an article whose text lines are missing
+            if pmid is not None:
+                yield Document(pmid, title, abstract, tuple(entities), tuple(relations))
+            pmid, title, abstract, entities, relations = line_pmid, '', '', [], []
+
+        if len(fields) >= 5 and fields[1].isdigit() and fields[2].isdigit():
+            entities.append(Entity(int(fields[1]), int(fields[2]), fields[3], fields[4],
+                                   fields[5] if len(fields) > 5 else ''))
+        else:
+            relations.append(Relation(fields[1], fields[2], fields[3] if len(fields) > 3 else ''))
+
+    if pmid is not None:
+        yield Document(pmid, title, abstract, tuple(entities), tuple(relations))
+
+
+def iter_pubtator_documents(file_path):
+    """Stream ``Document`` records from a PubTator text file with bounded memory."""
+    with open(file_path, 'r', encoding='utf-8') as pubtator_file:
+        yield from parse_pubtator_lines(pubtator_file)
+
+
+def iter_documents(file_path):
+    """Stream ``Document`` records from a PubTator file or a JSON-lines record file."""
+    if file_path.endswith('.jsonl'):
+        return iter_document_records(file_path)
+    return iter_pubtator_documents(file_path)
+
+
+def document_to_pubtator(document):
+    """Format a ``Document`` as a PubTator text block (without trailing newline)."""
+    lines = [f"{document.pmid}|t|{document.title}", f"{document.pmid}|a|{document.abstract}"]
+    for entity in document.entities:
+        lines.append('\t'.join([document.pmid, str(entity.start), str(entity.end), entity.text, entity.type,
+                                 entity.concept_id]))
+    for relation in document.relations:
+        lines.append('\t'.join([document.pmid, relation.type, relation.concept_1, relation.concept_2]))
+    return '\n'.join(lines)
+
+
+def document_to_json(document):
+    return json.dumps({
+        'pmid': document.pmid,
+        'title': document.title,
+        'abstract': document.abstract,
+        'entities': [list(entity) for entity in document.entities],
+        'relations': [list(relation) for relation in document.relations],
+    }, ensure_ascii=False)
+
+
+def document_from_json(line):
+    record = json.loads(line)
+    return Document(record['pmid'], record['title'], record['abstract'],
+                    tuple(Entity(*entity) for entity in record['entities']),
+                    tuple(Relation(*relation) for relation in record['relations']))
+
+
+def iter_document_records(file_path):
+    """Yield ``Document`` records from a JSON-lines file written by the fetcher."""
+    with open(file_path, 'r', encoding='utf-8') as record_file:
+        for line in record_file:
+            if line.strip():
+                yield document_from_json(line)
@@ -0,0 +1,64 @@
+# Overlapping fixed-size windows over long token sequences, and the merge of
+# per-window predictions back onto the document.  Long texts are cut into
+# windows of at most ``max_length`` tokens, consecutive windows sharing
+# ``stride`` tokens, so nothing past the model's length limit is lost.
+
+# Largest sequence BERT-style models accept, special tokens included
+MAX_LENGTH = 512
+# Tokens shared by consecutive windows
+STRIDE = 128
+
+
+def window_ranges(length, window, stride=STRIDE):
+    """(start, end) token ranges covering ``length`` tokens with windows of ``window`` tokens overlapping by ``stride``.
+
+    An empty sequence has no windows.
+    """
+    if window <= stride:
+        raise ValueError(f"The window ({window}) must be longer than the stride ({stride})")
+    if length == 0:
+        return []
+    ranges = [(0, min(window, length))]
+    while ranges[-1][1] < length:
+        start = ranges[-1][1] - stride
+        ranges.append((start, min(start + window, length)))
+    return ranges
+
+
+def merge_window_predictions(windows):
+    """Merge the token predictions of overlapping windows of one document.
+
+    ``windows`` holds, for each window, its ``((char_start, char_end), label)``
+    tokens in text order (special tokens left out).  A token seen in
+    several windows takes the label from the window where it lies farthest
+    from an edge, i.e. where the model saw the most context around it.
+    Returns the document's tokens sorted by position.
+    """
+    best = {}  # (char_start, char_end) -> (distance to the nearest window edge, label)
+    for tokens in windows:
+        for position, (offsets, label) in enumerate(tokens):
+            distance = min(position, len(tokens) - 1 - position)
+            if offsets not in best or distance > best[offsets][0]:
+                best[offsets] = (distance, label)
+    return [(offsets, label) for offsets, (_, label) in sorted(best.items())]
+
+
+def labels_to_spans(tokens):
+    """Character spans ``(start, end, entity_type)`` from ``((char_start, char_end), BIO label)`` tokens.
+
+    An I- label that does not continue an entity of the same type starts a
+    new one, as in seqeval's lenient mode.
+    """
+    spans = []
+    current = None  # [start, end, entity_type] of the entity being extended
+    for (start, end), label in tokens:
+        if label == 'O':
+            current = None
+            continue
+        prefix, _, entity_type = label.partition('-')
+        if prefix == 'I' and current is not None and current[2] == entity_type:
+            current[1] = end
+        else:
+            current = [start, end, entity_type]
+            spans.append(current)
+    return [tuple(span) for span in spans]
@@ -0,0 +1,82 @@
+import re
+from collections import defaultdict
+
+WORD = re.compile(r'\w+')
+WORD_CHARACTER = re.compile(r'\w')
+# Characters that make a term a real regular expression rather than a phrase
+REGEX_SYNTAX = set('.^$*+?{}[]\\|()')
+
+
+def term_phrase(term):
+    """Return the literal phrase of a ``\\bphrase\\b`` term, or None if the term is a real pattern."""
+    if not (term.startswith(r'\b') and term.endswith(r'\b')):
+        return None
+    phrase = term[2:-2]
+    if not phrase or REGEX_SYNTAX & set(phrase):
+        return None
+    if not (WORD_CHARACTER.match(phrase[0]) and WORD_CHARACTER.match(phrase[-1])):
+        return None
+    return phrase
+
+
+class TermMatcher:
+    """Counts many ``\\bphrase\\b`` terms in one scan over the words of a text.
+
+    ``categories`` maps a category name to its term patterns.  A term listed
+    in several categories is matched once and credited to each of them.  One
+    compiled alternation finds the words that start a phrase, and only the
+    phrases starting with that word are checked, so the cost barely grows
+    with the number of terms.  The counts are the same as
+    ``len(re.findall(term, text))`` for every term, including overlaps between
+    different terms (e.g. "parkinsons" and "parkinsons disease").  Terms that
+    are not plain phrases fall back to their own regex scan.
+    """
+
+    def __init__(self, categories):
+        self.categories = {}  # term -> categories it belongs to
+        self.phrases_by_first_word = defaultdict(list)
+        self.patterns = []
+        for category, terms in categories.items():
+            for term in terms:
+                if term in self.categories:
+                    self.categories[term].append(category)
+                    continue
+                self.categories[term] = [category]
+                phrase = term_phrase(term)
+                if phrase is None:
+                    self.patterns.append((term, re.compile(term)))
+                else:
+                    self.phrases_by_first_word[WORD.match(phrase).group()].append((phrase, term))
+
+        # Finds, at C speed, only the words that start a phrase; longer words first
+        # so the alternation never stops at a shorter word
+        first_words = sorted(self.phrases_by_first_word, key=len, reverse=True)
+        self.first_word_pattern = (re.compile(r'\b(?:' + '|'.join(map(re.escape, first_words)) + r')\b')
+                                   if first_words else None)
+
+    def count(self, text):
+        """Return {term: matches} for the terms that occur in ``text``."""
+        counts = {}
+        match_end = {}  # Matches of one term never overlap, as with re.findall
+        for word in self.first_word_pattern.finditer(text) if self.first_word_pattern else ():
+            start = word.start()
+            for phrase, term in self.phrases_by_first_word[word.group()]:
+                end = start + len(phrase)
+                if (start >= match_end.get(term, 0) and text.startswith(phrase, start)
+                        and not WORD_CHARACTER.match(text, end)):
+                    counts[term] = counts.get(term, 0) + 1
+                    match_end[term] = end
+
+        for term, pattern in self.patterns:
+            matches = len(pattern.findall(text))
+            if matches:
+                counts[term] = matches
+        return counts
+
+    def count_by_category(self, text, category_counts):
+        """Add the term counts of ``text`` to ``category_counts[category][term]`` and return them."""
+        counts = self.count(text)
+        for term, matches in counts.items():
+            for category in self.categories[term]:
+                category_counts[category][term] += matches
+        return counts
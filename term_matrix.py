@@ -0,0 +1,111 @@
+import json
+import sys
+
+import numpy as np
+from scipy import sparse
+
+
+def save_term_matrix(matrix_path, pmids, row_lengths, indices, data, terms, categories):
+    """Save an articles x terms count matrix in CSR form with its PMID and term arrays.
+
+    ``row_lengths`` holds the number of distinct terms of each article and
+    ``categories`` maps a category name to the indices of its terms.
+    """
+    indptr = np.zeros(len(row_lengths) + 1, dtype=np.int64)
+    np.cumsum(np.frombuffer(row_lengths, dtype=np.int64), out=indptr[1:])
+    np.savez_compressed(matrix_path,
+                        pmids=np.frombuffer(pmids, dtype=np.int64),
+                        indptr=indptr,
+                        indices=np.asarray(indices, dtype=np.int32),
+                        data=np.asarray(data, dtype=np.int32),
+                        terms=np.array(json.dumps(terms)),
+                        categories=np.array(json.dumps(categories)))
+    return TermMatrix(matrix_path)
+
+
+class TermMatrix:
+    """Articles x lexicon terms count matrix written by ``annotation_counts.process_article_file``.
+
+    ``matrix[i, j]`` is how often term ``terms[j]`` occurs in article
+    ``pmids[i]``.  Co-occurrence statistics are computed with sparse matrix
+    products instead of re-scanning the text.
+    """
+
+    def __init__(self, matrix_path):
+        with np.load(matrix_path) as stored:
+            self.pmids = stored['pmids']
+            self.terms = json.loads(str(stored['terms']))
+            self.categories = json.loads(str(stored['categories']))
+            self.matrix = sparse.csr_matrix((stored['data'], stored['indices'], stored['indptr']),
+                                            shape=(len(self.pmids), len(self.terms)))
+
+    def presence(self):
+        """Binary articles x terms matrix: 1 where the article mentions the term."""
+        presence = self.matrix.copy()
+        presence.data = np.ones_like(presence.data)
+        return presence
+
+    def category_matrix(self):
+        """Binary terms x categories membership matrix, columns in ``categories`` order."""
+        rows = [term for terms in self.categories.values() for term in terms]
+        columns = [column for column, terms in enumerate(self.categories.values()) for _ in terms]
+        return sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, columns)),
+                                 shape=(len(self.terms), len(self.categories)))
+
+    def document_frequencies(self):
+        """Number of articles mentioning each term."""
+        return np.diff(self.matrix.tocsc().indptr)
+
+    def category_document_frequencies(self):
+        """{category: number of articles mentioning at least one of its terms}."""
+        articles_by_category = self.presence() @ self.category_matrix()
+        counts = np.diff(articles_by_category.tocsc().indptr)
+        return dict(zip(self.categories, counts.tolist()))
+
+    def cooccurrence(self):
+        """Terms x terms matrix of the number of articles mentioning both terms."""
+        presence = self.presence()
+        return (presence.T @ presence).tocsr()
+
+    def pmi(self, min_count=1):
+        """Pointwise mutual information of every co-occurring pair of distinct terms.
+
+        Returns a sparse terms x terms matrix holding log2(P(a, b) / (P(a) P(b)))
+        over articles, for pairs seen together in at least ``min_count`` articles.
+        """
+        pairs = sparse.triu(self.cooccurrence(), k=1).tocoo()
+        keep = pairs.data >= min_count
+        rows, columns, counts = pairs.row[keep], pairs.col[keep], pairs.data[keep]
+        frequencies = self.document_frequencies()
+        values = np.log2(counts * len(self.pmids) / (frequencies[rows] * frequencies[columns]))
+        return sparse.csr_matrix((values, (rows, columns)), shape=pairs.shape)
+
+    def top_pairs(self, scores, n=20):
+        """The ``n`` highest-scoring term pairs of a sparse terms x terms matrix."""
+        scores = sparse.triu(scores, k=1).tocoo()
+        order = np.argsort(-scores.data, kind='stable')[:n]
+        return [(self.terms[scores.row[i]], self.terms[scores.col[i]], scores.data[i].item()) for i in order]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python term_matrix.py [matrix_file.npz] [min_count]")
+        print("\t[matrix_file.npz]: matrix written by annotation_counts.process_article_file(..., matrix_path=...)")
+        print("\t[min_count]: minimum number of shared articles for the PMI ranking, default 5")
+    else:
+        term_matrix = TermMatrix(sys.argv[1])
+        min_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+        print(f"{term_matrix.matrix.shape[0]} articles x {term_matrix.matrix.shape[1]} terms, "
+              f"{term_matrix.matrix.nnz} non-zero entries")
+
+        print("\nArticles per category:")
+        for category, count in term_matrix.category_document_frequencies().items():
+            print(f"{category}: {count}")
+
+        print("\nMost frequent co-occurring terms (articles):")
+        for first, second, count in term_matrix.top_pairs(term_matrix.cooccurrence()):
+            print(f"{first} + {second}: {count}")
+
+        print(f"\nHighest PMI pairs (at least {min_count} shared articles):")
+        for first, second, value in term_matrix.top_pairs(term_matrix.pmi(min_count)):
+            print(f"{first} + {second}: {value:.2f}")
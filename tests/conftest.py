@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The scripts live at the top of the repository, not in a package
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def corpus_path():
+    return os.path.join(ROOT, 'SessionNumber.txt')
+
+
+@pytest.fixture
+def small_corpus(tmp_path, corpus_path):
+    """The first 40 articles of the corpus, written to a PubTator file of their own."""
+    from itertools import islice
+
+    from pubtator_documents import document_to_pubtator, iter_documents
+
+    path = tmp_path / 'small.txt'
+    path.write_text('\n\n'.join(document_to_pubtator(document)
+                                for document in islice(iter_documents(corpus_path), 40)) + '\n\n', encoding='utf-8')
+    return str(path)
@@ -0,0 +1,24 @@
+import multiprocessing
+
+import numpy as np
+
+import annotation_counts
+import parallel_counts
+from term_matrix import TermMatrix
+
+
+def spawn_pool(processes, initializer=None):
+    return multiprocessing.get_context('spawn').Pool(processes, initializer=initializer)
+
+
+def test_term_matrix_columns_match_between_spawn_and_serial_runs(tmp_path, monkeypatch, corpus_path):
+    # Spawned workers re-import the module with their own string hash seed
+    annotation_counts.process_article_file(corpus_path, str(tmp_path / 'serial.txt'), matrix_path=str(tmp_path / 'serial.npz'))
+    monkeypatch.setattr(parallel_counts, 'process_pool', spawn_pool)
+    annotation_counts.process_article_file(corpus_path, str(tmp_path / 'spawn.txt'), processes=2,
+                                           matrix_path=str(tmp_path / 'spawn.npz'))
+
+    serial, spawned = TermMatrix(str(tmp_path / 'serial.npz')), TermMatrix(str(tmp_path / 'spawn.npz'))
+    assert serial.terms == spawned.terms
+    assert np.array_equal(np.asarray(serial.matrix.sum(axis=0)), np.asarray(spawned.matrix.sum(axis=0)))
+    assert (tmp_path / 'serial.txt').read_text() == (tmp_path / 'spawn.txt').read_text()
@@ -0,0 +1,55 @@
+from batch_scheduler import AdaptiveBatchScheduler
+
+
+def run(scheduler, fetch):
+    """Drive the scheduler to the end with ``fetch(batch)`` returning an HTTP status."""
+    while not scheduler.finished():
+        batch, _ = scheduler.next_batch()
+        status = fetch(batch)
+        if status == 200:
+            scheduler.record_success(batch, latency=0.1, payload_bytes=100)
+        else:
+            scheduler.record_failure(batch, f"HTTP {status}", status)
+    return scheduler.report()
+
+
+def test_duplicate_pmids_are_requested_once():
+    scheduler = AdaptiveBatchScheduler(['1', '2', '1', '3'], initial_batch_size=10)
+    assert scheduler.next_batch() == (('1', '2', '3'), 0.0)
+
+
+def test_fast_responses_grow_and_slow_ones_shrink_the_batch():
+    scheduler = AdaptiveBatchScheduler([str(pmid) for pmid in range(100)], initial_batch_size=8, max_batch_size=12,
+                                       target_latency=1.0)
+    batch, _ = scheduler.next_batch()
+    scheduler.record_success(batch, latency=0.1, payload_bytes=10)
+    assert scheduler.batch_size == 10
+    batch, _ = scheduler.next_batch()
+    scheduler.record_success(batch, latency=0.1, payload_bytes=10)
+    assert scheduler.batch_size == 12
+    batch, _ = scheduler.next_batch()
+    scheduler.record_success(batch, latency=5.0, payload_bytes=10)
+    assert scheduler.batch_size == 6
+
+
+def test_transient_failures_are_retried():
+    failures = {'count': 0}
+
+    def fetch(batch):
+        failures['count'] += 1
+        return 503 if failures['count'] <= 2 else 200
+
+    scheduler = AdaptiveBatchScheduler(['1', '2', '3'], initial_batch_size=3, base_backoff=0.0)
+    report = run(scheduler, fetch)
+    assert report['fetched'] == 3
+    assert report['retries'] == 2
+    assert report['failed'] == {}
+
+
+def test_rejected_batch_is_split_until_the_bad_pmid_is_isolated():
+    pmids = [str(pmid) for pmid in range(8)]
+    scheduler = AdaptiveBatchScheduler(pmids, initial_batch_size=8, max_batch_size=8)
+    report = run(scheduler, lambda batch: 400 if '5' in batch else 200)
+    assert report['failed'] == {'5': 'HTTP 400'}
+    assert report['fetched'] == 7
+    assert report['splits'] == 3
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from concept_index import ConceptIndex, build_concept_index
+from pubtator_documents import NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID, iter_documents
+
+
+@pytest.fixture
+def index(tmp_path, corpus_path):
+    return build_concept_index(corpus_path, str(tmp_path / 'index.npz'))
+
+
+def corpus_postings(corpus_path):
+    postings = {}
+    for document in iter_documents(corpus_path):
+        for entity in document.entities:
+            if entity.concept_id:
+                postings.setdefault(entity.concept_id, set()).add(int(document.pmid))
+    return postings
+
+
+def test_postings_round_trip(index, tmp_path, corpus_path):
+    expected = corpus_postings(corpus_path)
+    # Reloading from disk must give back the same delta-decoded lists
+    loaded = ConceptIndex(str(tmp_path / 'index.npz'))
+    assert set(loaded.positions) == set(expected)
+    for concept_id, pmids in expected.items():
+        assert loaded.postings(concept_id).tolist() == sorted(pmids)
+
+
+def test_all_of_matches_a_corpus_scan(index, corpus_path):
+    expected = sorted(int(document.pmid) for document in iter_documents(corpus_path)
+                      if {entity.concept_id for entity in document.entities} & set(NEURODEGENERATIVE_IDS)
+                      and any(entity.concept_id == SMELL_DISORDER_ID for entity in document.entities))
+    assert index.all_of(NEURODEGENERATIVE_IDS, {SMELL_DISORDER_ID}).tolist() == expected
+
+
+def test_unknown_concepts_match_nothing(index):
+    assert 'MESH:NOT-A-CONCEPT' not in index
+    assert len(index.postings('MESH:NOT-A-CONCEPT')) == 0
+    assert len(index.any_of([])) == 0
+    assert np.array_equal(index.any_of(['MESH:NOT-A-CONCEPT', SMELL_DISORDER_ID]), index.postings(SMELL_DISORDER_ID))
+
+
+def test_all_of_needs_a_group(index):
+    with pytest.raises(ValueError):
+        index.all_of()
@@ -0,0 +1,38 @@
+import sqlite3
+from functools import partial
+
+import pytest
+
+import entity_type_counts
+import text_stats
+from pubtator_documents import iter_documents
+
+spacy = pytest.importorskip('spacy')
+
+
+@pytest.fixture
+def sentencizer_model(tmp_path):
+    # A blank pipeline stands in for en_core_web_sm: the test is about the plumbing, not the model
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+    nlp.to_disk(tmp_path / 'model')
+    return nlp, str(tmp_path / 'model')
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_parallel_run_counts_abstract_stats(tmp_path, monkeypatch, small_corpus, sentencizer_model, processes):
+    nlp, model_path = sentencizer_model
+    monkeypatch.setattr(entity_type_counts, 'abstract_stats', partial(text_stats.abstract_stats, model=model_path))
+    cache_path = str(tmp_path / 'stats.sqlite')
+
+    entity_type_counts.parse_pubtator_file(small_corpus, processes=processes, stats_cache=cache_path,
+                                           stats_mode='senter')
+
+    with sqlite3.connect(cache_path) as connection:
+        cached = {pmid: (tokens, sentences)
+                  for pmid, tokens, sentences in connection.execute("SELECT pmid, tokens, sentences FROM text_stats")}
+    expected = {}
+    for document in iter_documents(small_corpus):
+        doc = nlp(document.abstract.strip())
+        expected[document.pmid] = (len(doc), sum(1 for _ in doc.sents))
+    assert cached == expected
@@ -0,0 +1,56 @@
+from collections import Counter
+from itertools import islice
+
+from count_neuro_and_smell_IE import summarize_article
+from incremental_counts import IncrementalAggregator
+from pubtator_documents import document_to_pubtator, iter_documents
+
+
+def write_corpus(path, documents):
+    path.write_text(''.join(document_to_pubtator(document) + '\n\n' for document in documents), encoding='utf-8')
+
+
+def full_recount(path):
+    totals = Counter()
+    for document in iter_documents(str(path)):
+        totals.update(summarize_article(document))
+    return Counter({key: count for key, count in totals.items() if count})
+
+
+def test_appended_articles_match_a_full_recount(tmp_path, corpus_path):
+    documents = list(islice(iter_documents(corpus_path), 60))
+    corpus, state = tmp_path / 'corpus.txt', str(tmp_path / 'state.json.gz')
+    write_corpus(corpus, documents[:40])
+    assert IncrementalAggregator(state, summarize_article).update(str(corpus)) == (40, 0)
+
+    write_corpus(corpus, documents)
+    aggregator = IncrementalAggregator(state, summarize_article)
+    # Only the appended part of the file is read again
+    assert aggregator.update(str(corpus)) == (20, 0)
+    assert aggregator.totals == full_recount(corpus)
+    assert set(aggregator.pmids()) == {document.pmid for document in documents}
+
+
+def test_removed_and_changed_articles_match_a_full_recount(tmp_path, corpus_path):
+    documents = list(islice(iter_documents(corpus_path), 40))
+    corpus, state = tmp_path / 'corpus.txt', str(tmp_path / 'state.json.gz')
+    write_corpus(corpus, documents)
+    IncrementalAggregator(state, summarize_article).update(str(corpus))
+
+    # Drop nine of the first ten articles and strip the annotations of the tenth
+    changed = documents[5]._replace(entities=(), relations=())
+    write_corpus(corpus, documents[10:] + [changed])
+    aggregator = IncrementalAggregator(state, summarize_article)
+    assert aggregator.update(str(corpus)) == (1, 9)
+    assert aggregator.totals == full_recount(corpus)
+
+
+def test_unchanged_input_is_not_summarized_again(tmp_path, corpus_path):
+    corpus, state = tmp_path / 'corpus.txt', str(tmp_path / 'state.json.gz')
+    write_corpus(corpus, islice(iter_documents(corpus_path), 10))
+    IncrementalAggregator(state, summarize_article).update(str(corpus))
+
+    def fail(document):
+        raise AssertionError(f"{document.pmid} was summarized again")
+
+    assert IncrementalAggregator(state, fail).update(str(corpus)) == (0, 0)
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from association_queries import AssociationQueries, concept_ids
+from knowledge_base import DEFAULT_METADATA_PATH, load_knowledge_base
+from pubtator_documents import NEURODEGENERATIVE_IDS, SMELL_DISORDER_ID, iter_documents
+
+
+@pytest.fixture
+def queries(tmp_path, small_corpus):
+    database_path = str(tmp_path / 'kb.sqlite')
+    load_knowledge_base(small_corpus, database_path, metadata_path=None).close()
+    queries = AssociationQueries(database_path)
+    yield queries
+    queries.close()
+
+
+def mentioned_concepts(document):
+    return {entity.concept_id for entity in document.entities}
+
+
+def test_concept_groups_expand_to_sorted_ids():
+    assert concept_ids(['smell_disorder', 'parkinson']) == ('MESH:D000857', 'MESH:D010300')
+    assert concept_ids('MESH:D010300,parkinson') == ('MESH:D010300',)
+
+
+def test_co_occurrence_matches_a_corpus_scan(queries, small_corpus):
+    expected = sorted(int(document.pmid) for document in iter_documents(small_corpus)
+                      if mentioned_concepts(document) & set(NEURODEGENERATIVE_IDS)
+                      and SMELL_DISORDER_ID in mentioned_concepts(document))
+    assert expected
+    result = queries.co_occurrence('neurodegenerative', 'smell_disorder')
+    assert result == {'articles': len(expected), 'pmids': expected}
+    # Both argument orders share one cache entry
+    assert queries.co_occurrence('smell_disorder', 'neurodegenerative') == result
+    assert queries.cache_info().hits == 1
+
+
+def test_relations_match_a_corpus_scan(queries, small_corpus):
+    first, second = set(NEURODEGENERATIVE_IDS), {SMELL_DISORDER_ID}
+    expected = sorted((int(document.pmid), relation.type) for document in iter_documents(small_corpus)
+                      for relation in document.relations
+                      if {relation.concept_1, relation.concept_2} & first
+                      and {relation.concept_1, relation.concept_2} & second)
+    result = queries.relations('neurodegenerative', 'smell_disorder')
+    assert result['relations'] == len(expected)
+    assert sorted((row['pmid'], row['type']) for row in result['details']) == expected
+
+
+def test_reload_invalidates_the_cache(queries, tmp_path, small_corpus, corpus_path):
+    before = queries.articles_by_year('smell_disorder')
+    # A rebuild from another connection, now with the full corpus and its metadata
+    metadata_path = os.path.join(os.path.dirname(corpus_path), DEFAULT_METADATA_PATH)
+    load_knowledge_base(corpus_path, str(tmp_path / 'kb.sqlite'), metadata_path).close()
+    after = queries.articles_by_year('smell_disorder')
+    assert sum(after.values()) > sum(before.values())
+    assert sum(after.values()) == sum(SMELL_DISORDER_ID in mentioned_concepts(document)
+                                      for document in {document.pmid: document
+                                                       for document in iter_documents(corpus_path)}.values())
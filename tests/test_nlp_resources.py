@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import annotation_to_BIO
+import nlp_resources
+
+nltk = pytest.importorskip('nltk')
+
+
+@pytest.fixture
+def missing_punkt(tmp_path, monkeypatch):
+    """Punkt looks missing; ``nltk.download`` records the id of each process that calls it."""
+    from nltk.tokenize.punkt import PunktSentenceTokenizer
+
+    downloads = tmp_path / 'downloads'
+    downloads.touch()
+
+    def find(resource):
+        raise LookupError(resource)
+
+    def download(resource):
+        with open(downloads, 'a') as f:
+            f.write(f"{os.getpid()}\n")
+
+    monkeypatch.setattr(nltk.data, 'find', find)
+    monkeypatch.setattr(nltk, 'download', download)
+    # An untrained tokenizer stands in for the real model
+    monkeypatch.setattr(nltk.tokenize, 'PunktTokenizer', PunktSentenceTokenizer)
+    monkeypatch.setattr(nlp_resources, '_punkt', None)
+    return downloads
+
+
+def test_get_punkt_downloads_a_missing_model(missing_punkt):
+    assert nlp_resources.get_punkt() is nlp_resources.get_punkt()
+    assert missing_punkt.read_text().split() == [str(os.getpid())]
+
+
+def test_workers_load_punkt_without_downloading_it(missing_punkt, small_corpus):
+    tagged = list(annotation_to_BIO.iter_tagged_documents(small_corpus, processes=2))
+    assert len(tagged) == 40
+    # Only the parent downloads, once, before the pool starts
+    assert missing_punkt.read_text().split() == [str(os.getpid())]
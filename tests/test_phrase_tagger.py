@@ -0,0 +1,66 @@
+import re
+
+import pytest
+
+import annotation_to_BIO
+from phrase_tagger import PhraseTagger, term_phrases, word_variants
+from pubtator_documents import iter_documents
+
+
+def word_by_word_tags(text):
+    """The tagger annotation_to_BIO used before PhraseTagger: each word is matched on its own against
+    every term, and consecutive words of one type are chained with I- tags."""
+    tags = []
+    current = None
+    for word in text.split():
+        label = next((label for label, terms in annotation_to_BIO.ENTITY_TERMS.items()
+                      if any(re.fullmatch(term, word.lower()) for term in terms)), None)
+        if label is None:
+            tags.append((word, 'O'))
+        else:
+            tags.append((word, f'I-{label}' if current == label else f'B-{label}'))
+        current = label
+    return tags
+
+
+def test_word_variants_expand_optional_characters():
+    assert sorted(word_variants('parkinson[s]?')) == ['parkinson', 'parkinsons']
+    assert word_variants('colou?r') == ['colour', 'color']
+    with pytest.raises(ValueError):
+        word_variants('smell.*')
+
+
+def test_term_phrases_split_words():
+    assert sorted(term_phrases(r'\balzheimer[s]?\s+disease\b')) == [('alzheimer', 'disease'), ('alzheimers', 'disease')]
+
+
+def test_longest_phrase_wins():
+    tagger = PhraseTagger({'SMELL': {r'\bsmell\b', r'\bsmell\s+loss\b'}, 'TEST': {r'\bsmell\s+loss\s+test\b'}})
+    words = 'a smell loss test and smell loss'.split()
+    assert tagger.tag(words) == [('a', 'O'), ('smell', 'B-TEST'), ('loss', 'I-TEST'), ('test', 'I-TEST'),
+                                 ('and', 'O'), ('smell', 'B-SMELL'), ('loss', 'I-SMELL')]
+
+
+def test_first_label_wins_for_shared_phrases():
+    tagger = PhraseTagger({'FIRST': {r'\bodor\b'}, 'SECOND': {r'\bodor\b'}})
+    assert tagger.tag(['odor']) == [('odor', 'B-FIRST')]
+
+
+def test_trie_keeps_every_word_by_word_tag(small_corpus):
+    """The trie tagger only adds phrases of several words and splits adjacent entities; it never drops
+    or retypes a word the old tagger tagged."""
+    added = 0
+    for document in iter_documents(small_corpus):
+        for sentence in re.split(r'(?<=[.!?])\s+', f"{document.title} {document.abstract}"):
+            text = annotation_to_BIO.clean_text(sentence)
+            old, new = word_by_word_tags(text), annotation_to_BIO.tag_entities(text)
+            assert [word for word, _ in old] == [word for word, _ in new]
+            for position, ((_, old_tag), (_, new_tag)) in enumerate(zip(old, new)):
+                if old_tag != 'O':
+                    assert new_tag[2:] == old_tag[2:]
+                elif new_tag != 'O':
+                    # A new tag is part of a phrase of several words
+                    neighbours = new[position - 1:position] + new[position + 1:position + 2]
+                    assert new_tag.startswith('I-') or any(tag == f'I-{new_tag[2:]}' for _, tag in neighbours)
+                    added += 1
+    assert added
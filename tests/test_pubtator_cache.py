@@ -0,0 +1,49 @@
+from itertools import islice
+
+from pubtator_cache import PubTatorCache, split_documents
+from pubtator_documents import document_to_pubtator, iter_documents, parse_pubtator_lines
+
+
+def export_response(documents):
+    return '\n\n'.join(document_to_pubtator(document) for document in documents) + '\n\n'
+
+
+def test_split_documents_keys_blocks_by_pmid(corpus_path):
+    documents = list(islice(iter_documents(corpus_path), 3))
+    blocks = split_documents(export_response(documents))
+    assert list(blocks) == [document.pmid for document in documents]
+    assert blocks[documents[1].pmid] == document_to_pubtator(documents[1]).strip()
+
+
+def test_cache_resumes_from_its_manifest(tmp_path, corpus_path):
+    documents = list(islice(iter_documents(corpus_path), 6))
+    pmids = [document.pmid for document in documents]
+    cache = PubTatorCache(str(tmp_path / 'cache'))
+    # The server left out the last PMID of the batch
+    assert cache.store_batch(pmids[:3], export_response(documents[:2])) == [pmids[2]]
+
+    reopened = PubTatorCache(str(tmp_path / 'cache'))
+    assert reopened.missing(pmids) == pmids[2:]
+    assert reopened.load(pmids[0]) == document_to_pubtator(documents[0]).strip()
+
+
+def test_truncated_manifest_line_is_ignored(tmp_path, corpus_path):
+    documents = list(islice(iter_documents(corpus_path), 2))
+    cache = PubTatorCache(str(tmp_path / 'cache'))
+    cache.store_batch([documents[0].pmid], export_response(documents[:1]))
+    with open(cache.manifest_path, 'a', encoding='utf-8') as manifest:
+        manifest.write('{"documents": {"' + documents[1].pmid)
+    assert PubTatorCache(str(tmp_path / 'cache')).missing([document.pmid for document in documents]) == \
+        [documents[1].pmid]
+
+
+def test_assemble_round_trips_the_documents(tmp_path, corpus_path):
+    documents = list(islice(iter_documents(corpus_path), 5))
+    pmids = [document.pmid for document in documents]
+    cache = PubTatorCache(str(tmp_path / 'cache'))
+    cache.store_batch(pmids, export_response(documents))
+
+    output_path = tmp_path / 'assembled.txt'
+    assert cache.assemble(pmids + ['0'], str(output_path), batch_size=2) == 1
+    with open(output_path, encoding='utf-8') as assembled:
+        assert list(parse_pubtator_lines(assembled)) == documents
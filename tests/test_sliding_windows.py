@@ -0,0 +1,76 @@
+import pytest
+
+import convert_pubtator_to_bio
+import nlp_resources
+from sliding_windows import labels_to_spans, merge_window_predictions, window_ranges
+
+
+def test_empty_sequence_has_no_windows():
+    assert window_ranges(0, 8, 2) == []
+
+
+def test_short_sequence_is_one_window():
+    assert window_ranges(5, 8, 2) == [(0, 5)]
+
+
+def test_one_token_past_the_window_adds_an_overlapping_window():
+    assert window_ranges(9, 8, 2) == [(0, 8), (6, 9)]
+
+
+def test_windows_cover_every_token_and_overlap_by_the_stride():
+    ranges = window_ranges(100, 16, 4)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 100
+    for (_, previous_end), (start, _) in zip(ranges, ranges[1:]):
+        assert previous_end - start == 4
+
+
+def test_window_must_be_longer_than_the_stride():
+    with pytest.raises(ValueError):
+        window_ranges(10, 4, 4)
+
+
+def test_merge_takes_each_token_from_the_window_where_it_is_most_central():
+    tokens = [((i, i + 1), f'L{i}') for i in range(6)]
+    # Token 3 is the last of the first window but central in the second one
+    first = [(offsets, 'first') for offsets, _ in tokens[:4]]
+    second = [(offsets, 'second') for offsets, _ in tokens[2:]]
+    merged = merge_window_predictions([first, second])
+    assert [offsets for offsets, _ in merged] == [offsets for offsets, _ in tokens]
+    assert [label for _, label in merged] == ['first', 'first', 'first', 'second', 'second', 'second']
+
+
+def test_labels_to_spans_joins_continuations_and_splits_stray_inside_tags():
+    tokens = [((0, 3), 'B-Disease'), ((4, 8), 'I-Disease'), ((9, 12), 'O'),
+              ((13, 16), 'I-Disease'), ((17, 20), 'I-Smell')]
+    assert labels_to_spans(tokens) == [(0, 8, 'Disease'), (13, 16, 'Disease'), (17, 20, 'Smell')]
+
+
+@pytest.fixture
+def word_tokenizer(tmp_path, monkeypatch):
+    # A tiny WordPiece vocabulary stands in for bert-base-cased, which needs a download
+    transformers = pytest.importorskip('transformers')
+    from tokenizers import BertWordPieceTokenizer
+
+    vocab = tmp_path / 'vocab.txt'
+    vocab.write_text('\n'.join(['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]', 'smell', 'loss', 'in', 'parkinson']))
+    tokenizer = transformers.BertTokenizerFast(tokenizer_object=BertWordPieceTokenizer(str(vocab)),
+                                               unk_token='[UNK]', sep_token='[SEP]', cls_token='[CLS]',
+                                               pad_token='[PAD]', mask_token='[MASK]')
+    monkeypatch.setitem(nlp_resources._tokenizers, convert_pubtator_to_bio.TOKENIZER_NAME, tokenizer)
+    return tokenizer
+
+
+@pytest.mark.parametrize('max_length', [None, 6])
+def test_empty_documents_are_skipped(word_tokenizer, max_length):
+    data = [(' ', []), ('smell loss in parkinson', [(0, 10, 'Smell')])]
+    bio_data = convert_pubtator_to_bio.convert_to_bio_format(data, max_length=max_length, stride=2)
+    assert all(bio_data)
+    assert bio_data[0][:2] == [('smell', 'B-Smell'), ('loss', 'I-Smell')]
+
+
+def test_long_document_is_written_as_overlapping_windows(word_tokenizer):
+    # Six model tokens with room for four per window (two special tokens)
+    data = [('smell loss in parkinson smell loss', [])]
+    bio_data = convert_pubtator_to_bio.convert_to_bio_format(data, max_length=6, stride=2)
+    assert [[token for token, _ in window] for window in bio_data] == [
+        ['smell', 'loss', 'in', 'parkinson'], ['in', 'parkinson', 'smell', 'loss']]
@@ -0,0 +1,34 @@
+from itertools import islice
+
+from pubtator_documents import document_to_pubtator, iter_documents
+from unicode_normalize import normalize_document, normalize_file, normalize_text
+
+
+def test_normalization_keeps_the_length():
+    text = 'α-synuclein and Sniffin’ Sticks — 5 µm, naïve Ω ☃'
+    normalized = normalize_text(text)
+    assert len(normalized) == len(text)
+    assert normalized.startswith('a-synuclein and Sniffin')
+    assert 'naive' in normalized
+
+
+def test_ascii_text_is_returned_as_is():
+    text = 'smell loss in Parkinson disease'
+    assert normalize_text(text) is text
+
+
+def test_entity_offsets_stay_valid(corpus_path):
+    for document in islice(iter_documents(corpus_path), 200):
+        normalized = normalize_document(document)
+        text = f"{normalized.title} {normalized.abstract}"
+        for original, entity in zip(document.entities, normalized.entities):
+            assert text[entity.start:entity.end] == entity.text
+            assert len(entity.text) == len(original.text)
+
+
+def test_normalized_file_parses_to_the_same_documents(tmp_path, small_corpus):
+    output_path = tmp_path / 'normalized.txt'
+    normalize_file(small_corpus, str(output_path))
+    expected = [normalize_document(document) for document in iter_documents(small_corpus)]
+    assert [document_to_pubtator(document) for document in iter_documents(str(output_path))] == \
+        [document_to_pubtator(document) for document in expected]
@@ -0,0 +1,138 @@
+import hashlib
+import importlib.metadata
+import sqlite3
+import sys
+
+from pubtator_documents import iter_documents
+
+DEFAULT_MODEL = 'en_core_web_sm'
+DEFAULT_CACHE_PATH = 'text_stats.sqlite'
+DEFAULT_BATCH_SIZE = 64
+
+# Components each statistics pipeline keeps; everything else in the model is
+# excluded at load time.  Token counts only need the tokenizer.  "parser"
+# gives exactly the sentences of the full pipeline; "senter" is the much
+# faster statistical sentence splitter, whose boundaries can differ slightly.
+STATS_PIPELINES = {
+    'parser': ('tok2vec', 'parser'),
+    'senter': ('senter',),
+}
+MODEL_COMPONENTS = ('tok2vec', 'tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer', 'ner')
+
+# PMIDs looked up in the cache per query; stays below SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+
+def load_stats_pipeline(model=DEFAULT_MODEL, mode='parser'):
+    """Load ``model`` with only the components needed to count tokens and sentences."""
+    import spacy
+
+    keep = STATS_PIPELINES[mode]
+    nlp = spacy.load(model, exclude=[name for name in MODEL_COMPONENTS if name not in keep])
+    for name in keep:
+        # senter ships disabled in the en_core_web models
+        if name in nlp.disabled:
+            nlp.enable_pipe(name)
+    return nlp
+
+
+def pipeline_id(model=DEFAULT_MODEL, mode='parser'):
+    """Identify the model version and mode the cached counts were made with, without loading the model.
+
+    The version is read from the installed package metadata, so a fully
+    cached run does not import spaCy.  A model loaded from a path has no
+    package and is identified as "unknown".
+    """
+    try:
+        version = importlib.metadata.version(model)
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    return f"{model}=={version or 'unknown'}:{mode}"
+
+
+def text_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def open_stats_cache(cache_path=DEFAULT_CACHE_PATH):
+    connection = sqlite3.connect(cache_path)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS text_stats (
+            pmid TEXT NOT NULL,
+            pipeline TEXT NOT NULL,
+            text_sha1 TEXT NOT NULL,
+            tokens INTEGER NOT NULL,
+            sentences INTEGER NOT NULL,
+            PRIMARY KEY (pmid, pipeline)
+        )
+    """)
+    return connection
+
+
+def _cached_stats(connection, pipeline, pmids):
+    cached = {}
+    for i in range(0, len(pmids), LOOKUP_CHUNK):
+        chunk = pmids[i:i + LOOKUP_CHUNK]
+        placeholders = ','.join('?' * len(chunk))
+        for pmid, digest, tokens, sentences in connection.execute(
+                f"SELECT pmid, text_sha1, tokens, sentences FROM text_stats "
+                f"WHERE pipeline = ? AND pmid IN ({placeholders})", [pipeline] + chunk):
+            cached[pmid] = (digest, tokens, sentences)
+    return cached
+
+
+def abstract_stats(documents, cache_path=DEFAULT_CACHE_PATH, mode='parser', model=DEFAULT_MODEL,
+                   n_process=1, batch_size=DEFAULT_BATCH_SIZE):
+    """Return {pmid: (tokens, sentences)} for the stripped abstract of every document.
+
+    Counts are cached per PMID (and pipeline) in SQLite; only abstracts that
+    are new or whose text changed go through ``nlp.pipe``, so a repeat run
+    does not load spaCy at all.
+    """
+    texts = {document.pmid: document.abstract.strip() for document in documents}
+    pipeline = pipeline_id(model, mode)
+    connection = open_stats_cache(cache_path)
+
+    stats = {}
+    missing = []
+    cached = _cached_stats(connection, pipeline, list(texts))
+    for pmid, text in texts.items():
+        digest = text_digest(text)
+        if pmid in cached and cached[pmid][0] == digest:
+            stats[pmid] = cached[pmid][1:]
+        else:
+            missing.append((text, (pmid, digest)))
+
+    if missing:
+        print(f"{len(stats)} abstracts cached, processing {len(missing)} with spaCy ({pipeline})")
+        nlp = load_stats_pipeline(model, mode)
+        rows = []
+        for doc, (pmid, digest) in nlp.pipe(missing, as_tuples=True, batch_size=batch_size, n_process=n_process):
+            stats[pmid] = (len(doc), sum(1 for _ in doc.sents))
+            rows.append((pmid, pipeline, digest) + stats[pmid])
+            if len(rows) >= LOOKUP_CHUNK:
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO text_stats VALUES (?, ?, ?, ?, ?)", rows)
+                rows = []
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO text_stats VALUES (?, ?, ?, ?, ?)", rows)
+
+    connection.close()
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python text_stats.py [input_file] [cache_file] [parser|senter] [processes]")
+        print("\t[input_file]: PubTator file (or JSON-lines records) whose abstracts are counted")
+        print(f"\t[cache_file]: per-PMID token/sentence cache, default {DEFAULT_CACHE_PATH}")
+        print("\t[parser|senter]: sentence splitter, default parser (same sentences as the full pipeline)")
+        print("\t[processes]: spaCy worker processes, default 1")
+    else:
+        cache_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CACHE_PATH
+        mode = sys.argv[3] if len(sys.argv) > 3 else 'parser'
+        n_process = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+        stats = abstract_stats(iter_documents(sys.argv[1]), cache_path, mode, n_process=n_process)
+        print(f"Total Articles: {len(stats)}")
+        print(f"Total Tokens: {sum(tokens for tokens, _ in stats.values())}")
+        print(f"Total Sentences: {sum(sentences for _, sentences in stats.values())}")
@@ -0,0 +1,80 @@
+import os
+import sys
+from unidecode import unidecode
+
+from pubtator_documents import Document, Entity
+
+UNICODE_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib', 'unicode.txt')
+
+
+class TranslationTable(dict):
+    """``str.translate`` map that replaces every character by exactly one character.
+
+    Entries come from lib/unicode.txt; characters missing from it fall back to
+    unidecode, but only when that gives a single character.  Because no
+    character ever grows or disappears, PubTator offsets stay valid after
+    normalization.  Lookups are memoized, so each code point is resolved once.
+    """
+
+    def __missing__(self, code_point):
+        if code_point < 128:
+            replacement = code_point
+        else:
+            transliterated = unidecode(chr(code_point))
+            replacement = transliterated if len(transliterated) == 1 else code_point
+        self[code_point] = replacement
+        return replacement
+
+
+def load_translation_table(table_path=UNICODE_TABLE_PATH):
+    table = TranslationTable()
+    with open(table_path, 'r', encoding='utf-8') as input_file_unicode:
+        for line in input_file_unicode:
+            # Only drop the newline: some replacements are a single space
+            parts = line.rstrip('\r\n').split("\t")
+            if len(parts) == 2 and len(parts[0]) == 1 and len(parts[1]) == 1:
+                uni, reg = parts
+                table[ord(uni)] = reg
+    return table
+
+
+_translation_table = None
+
+
+def get_translation_table():
+    global _translation_table
+    if _translation_table is None:
+        _translation_table = load_translation_table()
+    return _translation_table
+
+
+def normalize_text(text):
+    """Replace non-ASCII characters without changing the length of ``text``."""
+    if text.isascii():
+        return text
+    return text.translate(get_translation_table())
+
+
+def normalize_document(document):
+    """Normalize the title, abstract and mention texts of a ``Document`` record."""
+    return Document(document.pmid, normalize_text(document.title), normalize_text(document.abstract),
+                    tuple(Entity(entity.start, entity.end, normalize_text(entity.text), entity.type,
+                                 entity.concept_id) for entity in document.entities),
+                    document.relations)
+
+
+def normalize_file(input_file_path, output_file_path):
+    """Normalize a PubTator (or JSON-lines record) file line by line."""
+    with open(input_file_path, 'r', encoding='utf-8') as input_file, \
+            open(output_file_path, 'w', encoding='utf-8') as output_file:
+        for line in input_file:
+            output_file.write(normalize_text(line))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python unicode_normalize.py [input_file] [output_file]")
+        print("\t[input_file]: PubTator file (or JSON-lines records) to normalize")
+        print("\t[output_file]: normalized copy with the same character offsets")
+    else:
+        normalize_file(sys.argv[1], sys.argv[2])
@@ -1,37 +1,140 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline, Trainer, TrainingArguments
-from datasets import load_dataset, load_metric
+import argparse
+import copy
+import gzip
+import os
+import re
+from functools import partial
+
 import numpy as np
-from sklearn.metrics import classification_report
+
+from nlp_resources import get_tokenizer
+from sliding_windows import MAX_LENGTH, STRIDE, labels_to_spans, merge_window_predictions
+
+MODEL_NAME = "bert-base-cased"  # You can choose other models like BERT, GPT, etc.
+# Batches timed by measure_throughput for each padding strategy
+THROUGHPUT_BATCHES = 20
+# Columns of a tokenized dataset that are fed to the model
+MODEL_COLUMNS = ['input_ids', 'token_type_ids', 'attention_mask', 'labels']
+
+_metric = None
+
+
+def get_metric():
+    """The seqeval metric, loaded on first use."""
+    global _metric
+    if _metric is None:
+        # datasets.load_metric was removed in datasets 3.0; metrics now live in evaluate
+        import evaluate
+        _metric = evaluate.load("seqeval")
+    return _metric
+
+
+# Words of PubTator text: runs of word characters and single punctuation marks
+WORD = re.compile(r'\w+|[^\w\s]')
+# A line of a BIO file: word<TAB>tag
+BIO_LINE = re.compile(r'^[^\t]*\t(?:O|[BI]-\S+)$')
+
+
+def is_pubtator_file(path):
+    """True for a PubTator (or JSON-lines) corpus, False for a word<TAB>tag BIO file."""
+    if path.endswith('.jsonl'):
+        return True
+    with (gzip.open(path, 'rt', encoding='utf-8') if path.endswith('.gz') else open(path, encoding='utf-8')) as f:
+        for line in f:
+            if line.strip():
+                return not BIO_LINE.match(line.rstrip('\n'))
+    return False
+
+
+def iter_bio_sentences(path):
+    """Sentences of a BIO file written by annotation_to_BIO (optionally gzipped)."""
+    tokens, tags = [], []
+    with (gzip.open(path, 'rt', encoding='utf-8') if path.endswith('.gz') else open(path, encoding='utf-8')) as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line:
+                word, tag = line.rsplit('\t', 1)
+                tokens.append(word)
+                tags.append(tag)
+            elif tokens:
+                yield {'tokens': tokens, 'ner_tags': tags}
+                tokens, tags = [], []
+    if tokens:
+        yield {'tokens': tokens, 'ner_tags': tags}
+
+
+def iter_pubtator_sentences(path):
+    """One example per PubTator document: its words labelled from the entity annotations."""
+    from convert_pubtator_to_bio import assign_bio_labels
+    from pubtator_documents import iter_documents
+
+    for document in iter_documents(path):
+        text = f"{document.title} {document.abstract}"
+        words = list(WORD.finditer(text))
+        offsets = np.array([(word.start(), word.end()) for word in words], dtype=np.int64).reshape(-1, 2)
+        entities = [(entity.start, entity.end, entity.type) for entity in document.entities]
+        yield {'tokens': [word.group() for word in words], 'ner_tags': assign_bio_labels(offsets, entities)}
+
+
+def _generate_examples(paths):
+    for path in paths:
+        yield from iter_pubtator_sentences(path) if is_pubtator_file(path) else iter_bio_sentences(path)
 
 
 # Load PubTator-formatted dataset
-# Assuming the data is already in PubTator format and stored in a compatible format (NER tags, tokens)
+def load_pubtator_dataset(pubtator_file, cache_dir=None, num_proc=None):
+    """Load BIO files (entity_tags.txt-style) or PubTator corpora into a ``datasets.Dataset``.
+
+    ``pubtator_file`` is a path or a list of paths; each file's format is
+    detected from its first line.  The examples are written once to Arrow
+    files in the datasets cache (``cache_dir``) and memory-mapped from
+    there, so the corpus does not have to fit in RAM and later runs reuse
+    them.  The cache is keyed by the paths, sizes and modification times of
+    the files.
+    """
+    from datasets import Dataset, Features, Sequence, Value
+    from datasets.fingerprint import Hasher
 
-def load_pubtator_dataset(pubtator_file):
-    # Load your data here from PubTator format, this function is a placeholder for loading data
-    # Return it in the format:
-    #   tokens = [['token1', 'token2', ...], ...]
-    #   labels = [['B-ENTITY', 'O', 'O', 'B-ENTITY', ...], ...]
-    tokens = [['This', 'is', 'an', 'example'], ['Another', 'sentence']]
-    labels = [['O', 'O', 'O', 'B-DISEASE'], ['O', 'O']]
-    return tokens, labels
+    paths = [os.path.abspath(path) for path in ([pubtator_file] if isinstance(pubtator_file, str) else pubtator_file)]
+    features = Features({'tokens': Sequence(Value('string')), 'ner_tags': Sequence(Value('string'))})
+    # Edited files (or reader code) get a new fingerprint and are read again
+    fingerprint = Hasher.hash([_generate_examples, iter_bio_sentences, iter_pubtator_sentences,
+                               [(path, os.path.getsize(path), os.path.getmtime(path)) for path in paths]])
+    # Lists in gen_kwargs are split across processes, one share of the files each
+    num_proc = min(num_proc, len(paths)) if num_proc and num_proc > 1 else None
+    return Dataset.from_generator(_generate_examples, features=features, cache_dir=cache_dir, num_proc=num_proc,
+                                  gen_kwargs={'paths': paths}, fingerprint=fingerprint)
 
 
-# Load tokens and labels
-tokens, labels = load_pubtator_dataset("your_pubtator_file.txt")
+def dataset_labels(*datasets):
+    """Sorted label names of the datasets' ``ner_tags``, 'O' first and B-/I- of each type together."""
+    import pyarrow.compute as pc
 
-# Tokenizer and model
-model_name = "bert-base-cased"  # You can choose other models like BERT, GPT, etc.
-tokenizer = AutoTokenizer.from_pretrained(model_name)
+    labels = set()
+    for dataset in datasets:
+        labels.update(pc.unique(pc.list_flatten(dataset.data.column('ner_tags'))).to_pylist())
+    labels.discard('O')
+    return ['O'] + sorted(labels, key=lambda label: (label[2:], label[:2]))
 
 
 # Prepare data
-def tokenize_and_align_labels(tokens, labels):
-    tokenized_inputs = tokenizer(tokens, truncation=True, is_split_into_words=True, padding=True)
+def tokenize_and_align_labels(tokens, labels, max_length=MAX_LENGTH, stride=STRIDE, model_name=MODEL_NAME):
+    """Tokenize word-split sentences and align their labels to the first subword of each word.
+
+    A sentence longer than ``max_length`` subwords is split into overlapping
+    windows sharing ``stride`` subwords instead of being truncated, so no
+    entity is lost; each window becomes one training example.  Nothing is
+    padded here: batches are padded when they are collated.
+    """
+    tokenizer = get_tokenizer(model_name)
+    tokenized_inputs = tokenizer(tokens, truncation=True, max_length=max_length, stride=stride,
+                                 return_overflowing_tokens=True, is_split_into_words=True)
+    # Sentence each window was cut from
+    sample_mapping = tokenized_inputs.pop('overflow_to_sample_mapping')
 
     label_ids = []
-    for i, label in enumerate(labels):
+    for i, sample in enumerate(sample_mapping):
+        label = labels[sample]
         word_ids = tokenized_inputs.word_ids(batch_index=i)  # Map tokens to their respective word.
         previous_word_idx = None
         label_ids.append([])
@@ -47,28 +150,134 @@ def tokenize_and_align_labels(tokens, labels):
     return tokenized_inputs, label_ids
 
 
-# Tokenize and align
-tokenized_inputs, label_ids = tokenize_and_align_labels(tokens, labels)
+def _tokenize_batch(examples, label2id, max_length, stride, model_name):
+    label_ids = [[label2id[tag] for tag in tags] for tags in examples['ner_tags']]
+    tokenized_inputs, aligned_labels = tokenize_and_align_labels(examples['tokens'], label_ids, max_length, stride,
+                                                                 model_name)
+    tokenized_inputs['labels'] = aligned_labels
+    # Used to group examples of similar length into batches
+    tokenized_inputs['length'] = [len(input_ids) for input_ids in tokenized_inputs['input_ids']]
+    return tokenized_inputs
+
+
+def tokenize_dataset(dataset, label_list, max_length=MAX_LENGTH, stride=STRIDE, num_proc=None,
+                     model_name=MODEL_NAME):
+    """Tokenize and align a ``load_pubtator_dataset`` dataset with batched ``map`` on ``num_proc`` processes.
+
+    The result is cached next to the dataset's Arrow files under a
+    fingerprint of the dataset and of these arguments, so a repeat run
+    loads it instead of tokenizing again.
+    """
+    return dataset.map(_tokenize_batch, batched=True, num_proc=num_proc, remove_columns=dataset.column_names,
+                       fn_kwargs={'label2id': {label: i for i, label in enumerate(label_list)},
+                                  'max_length': max_length, 'stride': stride, 'model_name': model_name},
+                       desc="Tokenizing")
+
+
+def predict_entities(texts, model, tokenizer=None, max_length=MAX_LENGTH, stride=STRIDE, batch_size=16):
+    """Predict entity character spans ``[(start, end, entity_type), ...]`` for each of ``texts``.
+
+    Texts of any length are cut into overlapping windows of ``max_length``
+    subwords, run through ``model`` ``batch_size`` windows at a time (padded
+    only to the longest window of the batch) and merged back with
+    ``sliding_windows.merge_window_predictions``.  Subwords after the first
+    one of a word follow the word's prediction, as they are not trained.
+    """
+    import torch
+
+    tokenizer = tokenizer or get_tokenizer(MODEL_NAME)
+    encodings = tokenizer(texts, truncation=True, max_length=max_length, stride=stride,
+                          return_overflowing_tokens=True, return_offsets_mapping=True)
+    id2label = model.config.id2label
+    windows_by_text = [[] for _ in texts]
+
+    model.eval()
+    for batch_start in range(0, len(encodings['input_ids']), batch_size):
+        batch_windows = range(batch_start, min(batch_start + batch_size, len(encodings['input_ids'])))
+        batch = tokenizer.pad({'input_ids': [encodings['input_ids'][w] for w in batch_windows],
+                               'attention_mask': [encodings['attention_mask'][w] for w in batch_windows]},
+                              return_tensors='pt')
+        with torch.no_grad():
+            predictions = model(**batch).logits.argmax(dim=-1).tolist()
 
-# Define NER model
-model = AutoModelForTokenClassification.from_pretrained(model_name, num_labels=3)  # Adjust number of labels
+        for window, window_predictions in zip(batch_windows, predictions):
+            window_tokens = []
+            previous_word, previous_label = None, 'O'
+            for offsets, prediction, word in zip(encodings['offset_mapping'][window], window_predictions,
+                                                 encodings.word_ids(window)):
+                if word is None:  # Special token
+                    continue
+                label = id2label[prediction]
+                if word == previous_word:  # Later subword: continue the word's entity
+                    label = 'O' if previous_label == 'O' else f'I-{previous_label[2:]}'
+                window_tokens.append((tuple(offsets), label))
+                previous_word, previous_label = word, label
+            windows_by_text[encodings['overflow_to_sample_mapping'][window]].append(window_tokens)
 
-# Load metric
-metric = load_metric("seqeval")
+    return [labels_to_spans(merge_window_predictions(windows)) for windows in windows_by_text]
+
+
+def measure_throughput(model, dataset, data_collator, batch_size=16, group_by_length=True,
+                       max_batches=THROUGHPUT_BATCHES, train=True):
+    """Time ``max_batches`` batches of ``dataset`` through ``model`` and report the real tokens per second.
+
+    Only non-padding tokens are counted, so time spent on padding lowers the
+    figure.  Batches are drawn like the Trainer draws them: grouped by
+    length with ``group_by_length``, shuffled otherwise.  With ``train`` the
+    backward pass is timed too, on a copy of ``model`` so the caller's model
+    (weights, gradients and train/eval mode) is left as it was.
+    Returns {'tokens_per_second', 'padding_fraction', 'seconds'}.
+    """
+    import time
+
+    import torch
+    from torch.utils.data import DataLoader, RandomSampler
+    from transformers.trainer_pt_utils import LengthGroupedSampler
+
+    generator = torch.Generator().manual_seed(0)
+    features = dataset.select_columns([column for column in MODEL_COLUMNS if column in dataset.column_names])
+    if group_by_length:
+        sampler = LengthGroupedSampler(batch_size, lengths=dataset['length'], generator=generator)
+    else:
+        sampler = RandomSampler(features, generator=generator)
+    loader = DataLoader(features, batch_size=batch_size, sampler=sampler, collate_fn=data_collator)
+
+    model = copy.deepcopy(model) if train else model
+    was_training = model.training
+    model.train(train)
+    real_tokens = padded_tokens = 0
+    start = time.perf_counter()
+    for i, batch in enumerate(loader):
+        if i == max_batches:
+            break
+        if train:
+            model(**batch).loss.backward()
+            model.zero_grad()
+        else:
+            with torch.no_grad():
+                model(**batch)
+        real_tokens += int(batch['attention_mask'].sum())
+        padded_tokens += batch['input_ids'].numel()
+    seconds = time.perf_counter() - start
+    model.train(was_training)
+
+    return {'tokens_per_second': real_tokens / seconds, 'padding_fraction': 1 - real_tokens / padded_tokens,
+            'seconds': seconds}
 
 
 # Define compute metrics function for evaluation
-def compute_metrics(p):
+def compute_metrics(p, label_list):
     predictions, labels = p
     predictions = np.argmax(predictions, axis=2)
 
-    true_labels = [[label for label in label if label != -100] for label in labels]
+    # seqeval compares label names, not ids
+    true_labels = [[label_list[label] for label in label if label != -100] for label in labels]
     true_predictions = [
-        [p for (p, l) in zip(pred, label) if l != -100]
+        [label_list[p] for (p, l) in zip(pred, label) if l != -100]
         for pred, label in zip(predictions, labels)
     ]
 
-    results = metric.compute(predictions=true_predictions, references=true_labels)
+    results = get_metric().compute(predictions=true_predictions, references=true_labels)
     return {
         "precision": results["overall_precision"],
         "recall": results["overall_recall"],
@@ -77,35 +286,99 @@ def compute_metrics(p):
     }
 
 
-# Training arguments for fine-tuning the model
-training_args = TrainingArguments(
-    output_dir="./results",
-    evaluation_strategy="epoch",
-    learning_rate=2e-5,
-    per_device_train_batch_size=16,
-    per_device_eval_batch_size=16,
-    num_train_epochs=3,
-    weight_decay=0.01,
-)
-
-# Trainer class for handling training and evaluation
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=tokenized_inputs,
-    eval_dataset=tokenized_inputs,
-    compute_metrics=compute_metrics,
-)
-
-# Train model (Few-shot learning)
-trainer.train()
-
-# Evaluate model (Few-shot)
-results_few_shot = trainer.evaluate()
-print("Few-Shot Results:", results_few_shot)
-
-# Zero-shot NER using Hugging Face pipeline (if you don't want to train the model)
-zero_shot_ner = pipeline("ner", model=model_name, tokenizer=model_name)
-zero_shot_results = zero_shot_ner("This is an example sentence with anosmia and Parkinson's disease.")
-
-print("Zero-Shot NER Results:", zero_shot_results)
+def prepare_training():
+    """Load and tokenize the train/test BIO files and create the model and the batch collator."""
+    from transformers import AutoModelForTokenClassification, DataCollatorForTokenClassification
+
+    # Load tokens and labels: BIO files from annotation_to_BIO.py or a PubTator corpus
+    train_dataset = load_pubtator_dataset("train_tags.txt")
+    eval_dataset = load_pubtator_dataset("test_tags.txt")
+    label_list = dataset_labels(train_dataset, eval_dataset)
+
+    # Tokenize and align (cached: a second run with the same files starts immediately)
+    tokenized_train = tokenize_dataset(train_dataset, label_list, num_proc=os.cpu_count())
+    # Evaluation order does not matter, so sorted batches hold sequences of similar length
+    tokenized_eval = tokenize_dataset(eval_dataset, label_list, num_proc=os.cpu_count()).sort('length')
+
+    # Define NER model
+    model = AutoModelForTokenClassification.from_pretrained(
+        MODEL_NAME, num_labels=len(label_list),
+        id2label=dict(enumerate(label_list)), label2id={label: i for i, label in enumerate(label_list)})
+
+    # Pads each batch only to its longest sequence, rounded up to a multiple of 8 for the matrix kernels
+    data_collator = DataCollatorForTokenClassification(get_tokenizer(MODEL_NAME), pad_to_multiple_of=8)
+    return model, tokenized_train, tokenized_eval, label_list, data_collator
+
+
+def benchmark_throughput():
+    """Print training throughput with corpus-wide padding vs. length-grouped dynamic padding."""
+    from transformers import DataCollatorForTokenClassification
+
+    model, tokenized_train, _, _, data_collator = prepare_training()
+    global_padding = DataCollatorForTokenClassification(get_tokenizer(MODEL_NAME), padding='max_length',
+                                                        max_length=max(tokenized_train['length']))
+    before = measure_throughput(model, tokenized_train, global_padding, group_by_length=False)
+    after = measure_throughput(model, tokenized_train, data_collator, group_by_length=True)
+    print(f"Training throughput: {before['tokens_per_second']:.0f} tokens/s with global padding "
+          f"({before['padding_fraction']:.0%} padding), {after['tokens_per_second']:.0f} tokens/s "
+          f"length-grouped ({after['padding_fraction']:.0%} padding)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Few-shot fine-tuning and zero-shot NER on the BIO files.")
+    parser.add_argument("--benchmark-throughput", action="store_true",
+                        help="only compare training tokens/s of global vs. length-grouped padding, then exit")
+    args = parser.parse_args()
+    if args.benchmark_throughput:
+        benchmark_throughput()
+        return
+
+    from transformers import Trainer, TrainingArguments, pipeline
+
+    model, tokenized_train, tokenized_eval, label_list, data_collator = prepare_training()
+
+    # Training arguments for fine-tuning the model
+    training_args = TrainingArguments(
+        output_dir="./results",
+        evaluation_strategy="epoch",
+        learning_rate=2e-5,
+        per_device_train_batch_size=16,
+        per_device_eval_batch_size=16,
+        num_train_epochs=3,
+        weight_decay=0.01,
+        # Batches of similar-length sequences, so little of each batch is padding
+        group_by_length=True,
+        length_column_name="length",
+    )
+
+    # Trainer class for handling training and evaluation
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=tokenized_train,
+        eval_dataset=tokenized_eval,
+        # Pads inputs and labels of each batch
+        data_collator=data_collator,
+        compute_metrics=partial(compute_metrics, label_list=label_list),
+    )
+
+    # Train model (Few-shot learning)
+    trainer.train()
+
+    # Evaluate model (Few-shot)
+    results_few_shot = trainer.evaluate()
+    print("Few-Shot Results:", results_few_shot)
+
+    # Entity spans from the fine-tuned model; long texts are processed in overlapping windows
+    print("Few-Shot Entities:", predict_entities(["This is an example sentence with anosmia and Parkinson's disease."],
+                                                 model))
+
+    # Zero-shot NER using Hugging Face pipeline (if you don't want to train the model)
+    zero_shot_ner = pipeline("ner", model=MODEL_NAME, tokenizer=MODEL_NAME)
+    zero_shot_results = zero_shot_ner("This is an example sentence with anosmia and Parkinson's disease.")
+
+    print("Zero-Shot NER Results:", zero_shot_results)
+
+
+if __name__ == "__main__":
+    main()